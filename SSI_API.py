@@ -1,11 +1,109 @@
 #%% Data pull from SSI
+import json
+import os
+import socket
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 import requests
+import numpy as np
 import pandas as pd
 import time
 from datetime import datetime
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import streamlit as st 
+from utils import indicators, price_store
+from utils.utils import get_temp_path
+
+
+#%% Upstream request control
+# Overridable so the price layer can be pointed at a local stub server
+SSI_HISTORY_URL = os.environ.get("SSI_HISTORY_URL", "https://iboard-api.ssi.com.vn/statistics/charts/history")
+MAX_CONCURRENT_REQUESTS = int(os.environ.get("SSI_MAX_CONCURRENT_REQUESTS", "4"))
+REQUEST_TIMEOUT = float(os.environ.get("SSI_REQUEST_TIMEOUT", "15"))  # seconds, whole budget per fetch
+
+class SingleFlight:
+    """
+    Collapse concurrent calls that share a key into one execution.
+    The first caller runs the function; callers arriving while it is in flight
+    wait for it and receive the same result (or exception).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def do(self, key, fn, timeout=None):
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if leader:
+            try:
+                future.set_result(fn())
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._inflight[key]
+        return future.result(timeout=timeout)
+
+_history_flight = SingleFlight()
+_upstream_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+def _abort(resp):
+    """
+    Shut down the response's socket, which interrupts a read blocked on it.
+    """
+    sock = getattr(getattr(resp.raw, "connection", None), "sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+def _request_history(params):
+    """
+    One GET against the chart history endpoint, bounded by the process-wide
+    concurrency limit. REQUEST_TIMEOUT is the budget for the whole fetch:
+    queueing for a slot, connecting and reading the body. A response still
+    arriving at the deadline is cut off, so a slowly trickling server cannot
+    hold the call past it.
+    """
+    deadline = time.monotonic() + REQUEST_TIMEOUT
+    if not _upstream_slots.acquire(timeout=REQUEST_TIMEOUT):
+        raise TimeoutError("Timed out waiting for a free SSI request slot")
+    try:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("SSI request budget spent waiting for a slot")
+        resp = requests.get(SSI_HISTORY_URL, params=params, timeout=remaining, stream=True)
+        watchdog = threading.Timer(max(deadline - time.monotonic(), 0.0), _abort, args=(resp,))
+        watchdog.start()
+        try:
+            resp.raise_for_status()
+            body = resp.content
+        except requests.RequestException as e:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"SSI request exceeded its {REQUEST_TIMEOUT:g}s budget") from e
+            raise
+        finally:
+            watchdog.cancel()
+            resp.close()
+        return json.loads(body)
+    finally:
+        _upstream_slots.release()
+
+def get_history(symbol, from_unix, to_unix, resolution="1D"):
+    """
+    Fetch raw chart history, sharing one in-flight request between concurrent
+    callers asking for the same (symbol, resolution, range).
+    """
+    params = {"resolution": resolution, "symbol": symbol, "from": from_unix, "to": to_unix}
+    key = (symbol, resolution, from_unix, to_unix)
+    # The leader's fetch is bounded by REQUEST_TIMEOUT from its own start, so
+    # followers wait for its outcome instead of timing out on a clock of their own
+    return _history_flight.do(key, lambda: _request_history(params))
 
 
 #%% Helper functions
@@ -13,22 +111,10 @@ def get_unix_timestamp(date_str):
     # Input format: 'YYYY-MM-DD'
     return int(time.mktime(datetime.strptime(date_str, "%Y-%m-%d").timetuple()))
 
-@st.cache_data
-def fetch_ohlcv(symbol, start_date="2020-01-01", end_date=None):
-    if end_date is None:
-        end_date = datetime.today().strftime('%Y-%m-%d')
-    from_unix = get_unix_timestamp(start_date)
-    to_unix = get_unix_timestamp(end_date)
-
-    url = (
-        f"https://iboard-api.ssi.com.vn/statistics/charts/history"
-        f"?resolution=1D&symbol={symbol}&from={from_unix}&to={to_unix}"
-    )
-
-    resp = requests.get(url)
-    resp.raise_for_status()
-    data = resp.json()
-
+def parse_history(data):
+    """
+    Convert a chart history response into an OHLCV DataFrame.
+    """
     # Safety checks
     if data['code'] != "SUCCESS":
         raise Exception("API returned error: " + str(data))
@@ -56,15 +142,205 @@ def fetch_ohlcv(symbol, start_date="2020-01-01", end_date=None):
     return df
 
 
-def plot_ohlcv_candlestick(df, symbol, start_date = '2024-12-31'):
-    df_temp = df[df['date'] >= start_date].copy()
-    df_temp['date'] = df_temp['date'].dt.strftime('%Y-%m-%d')
+#%% Local price cache (stale-while-revalidate)
+PRICE_CACHE_TTL = int(os.environ.get("SSI_PRICE_TTL", "900"))  # seconds before cached bars are refreshed
+PRICE_HISTORY_START = "2015-01-01"  # earliest daily bar kept in the local store
+INTRADAY_HISTORY_DAYS = 30  # intraday bars kept in the local store
+REFRESH_OVERLAP_DAYS = 10  # stored days re-fetched on each refresh to detect price adjustments
+
+_price_memory = {}   # (symbol, resolution) -> (store version, bars)
+_refresh_errors = {}  # (symbol, resolution) -> message of the last failed refresh
+_refreshing = set()
+_price_lock = threading.Lock()
+_refresh_flight = SingleFlight()  # one store writer per (symbol, resolution) in this process
+# Background refreshes share a few threads; their requests still pass the upstream limiter
+_refresh_pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS, thread_name_prefix="price-refresh")
+
+def _read_cached_bars(symbol, resolution):
+    """
+    Return (compact bars, fetched_at) from the local store, or (None, None) on a miss.
+    The newest partition's mtime is the fetch time, so every process sees the same age.
+    """
+    version = price_store.store_version(symbol, resolution)
+    if version is None:
+        return None, None
+    key = (symbol, resolution)
+    with _price_lock:
+        cached = _price_memory.get(key)
+        if cached is None or cached[0] != version:
+            cached = (version, price_store.read_bars(symbol, resolution))
+            _price_memory[key] = cached
+    return cached[1], datetime.fromtimestamp(version[1] / 1e9)
+
+def _refresh_bars(symbol, resolution):
+    """
+    Fetch bars newer than the stored ones (or the whole kept history on a
+    miss) and merge them into the store. Concurrent refreshes of the same
+    key (cold loads and background refreshes alike) share one fetch and write.
+    """
+    return _refresh_flight.do((symbol, resolution), lambda: _fetch_and_store(symbol, resolution))
+
+def _fetch_bars(symbol, resolution, start):
+    end = (datetime.today() + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+    data = get_history(symbol, get_unix_timestamp(start), get_unix_timestamp(end), resolution)
+    return price_store.to_compact(parse_history(data))
+
+def _is_adjusted(stored, fresh):
+    """
+    True when re-fetched bars disagree with the stored copy of the same
+    timestamps (a split or dividend adjusted the history). The last stored bar
+    is left out, since it may have been partial.
+    """
+    overlap = stored.iloc[:-1].merge(fresh, on='t', suffixes=('', '_new'))
+    return not np.allclose(overlap['c'], overlap['c_new'], rtol=1e-3)
+
+def _fetch_and_store(symbol, resolution):
+    bars, _ = _read_cached_bars(symbol, resolution)
+    if resolution in price_store.INTRADAY:
+        history_start = (datetime.today() - pd.Timedelta(days=INTRADAY_HISTORY_DAYS)).strftime('%Y-%m-%d')
+    else:
+        history_start = PRICE_HISTORY_START
+    if bars is None or bars.empty:
+        price_store.write_bars(symbol, resolution, _fetch_bars(symbol, resolution, history_start))
+    else:
+        # Re-fetch a window of stored days along with the new bars; if the
+        # stored prices no longer match, the history was adjusted and is reloaded
+        last = datetime.fromtimestamp(int(bars['t'].iloc[-1]))
+        fresh = _fetch_bars(symbol, resolution, (last - pd.Timedelta(days=REFRESH_OVERLAP_DAYS)).strftime('%Y-%m-%d'))
+        if _is_adjusted(bars, fresh):
+            price_store.replace_bars(symbol, resolution, _fetch_bars(symbol, resolution, history_start))
+            # Indicators of the resolutions aggregated from these bars are stale too
+            derived = [r for r, source in price_store.DERIVED_FROM.items() if source == resolution]
+            for stale in [resolution] + derived:
+                _indicator_path(symbol, stale).unlink(missing_ok=True)
+        else:
+            price_store.write_bars(symbol, resolution, fresh)
+    with _price_lock:
+        _refresh_errors.pop((symbol, resolution), None)
+
+def _refresh_in_background(symbol, resolution):
+    key = (symbol, resolution)
+    with _price_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            _refresh_bars(symbol, resolution)
+        except Exception as e:
+            with _price_lock:
+                _refresh_errors[key] = str(e)
+        finally:
+            with _price_lock:
+                _refreshing.discard(key)
+
+    _refresh_pool.submit(run)
+
+def get_price_bars(symbol, resolution="1D", ttl=PRICE_CACHE_TTL):
+    """
+    Serve OHLCV bars from the local store, refreshing them in the background
+    once they are older than `ttl` seconds. Only a cache miss waits on SSI.
+    Weekly/monthly and 5-60 minute bars are aggregated locally from the
+    stored daily and 1-minute bars.
+
+    Returns (bars, status) where status holds:
+    - as_of: when the served bars were fetched
+    - stale: True when the bars are older than ttl
+    - error: message of the last failed refresh (bars are last-known-good), else None
+    """
+    source = price_store.DERIVED_FROM.get(resolution, resolution)
+    bars, fetched_at = _read_cached_bars(symbol, source)
+    if bars is None:
+        _refresh_bars(symbol, source)
+        bars, fetched_at = _read_cached_bars(symbol, source)
+
+    stale = (datetime.now() - fetched_at).total_seconds() > ttl
+    if stale:
+        _refresh_in_background(symbol, source)
+    with _price_lock:
+        error = _refresh_errors.get((symbol, source))
+    if source != resolution:
+        bars = price_store.aggregate_bars(bars, resolution)
+    return price_store.to_ohlcv(bars), {'as_of': fetched_at, 'stale': stale, 'error': error}
+
+
+#%% Indicators cached alongside the bars
+_indicator_memory = {}  # (symbol, resolution) -> (bars fingerprint, indicator frame)
+_indicator_locks = {}   # (symbol, resolution) -> lock held while updating its indicators
+
+def _indicator_path(symbol, resolution):
+    return price_store.get_store_dir(symbol, resolution) / "indicators.feather"
+
+def get_price_indicators(symbol, resolution, bars):
+    """
+    Indicators for `bars`, stored next to them in the price store and extended
+    incrementally when new bars append instead of recomputed each rerun.
+    Updates of one (symbol, resolution) run one at a time; callers queued
+    behind an update for the same bars reuse its result.
+    """
+    key = (symbol, resolution)
+    # The first close changes when the history is adjusted, which rules out an incremental update
+    fingerprint = (bars['close'].iloc[0], len(bars), bars['date'].iloc[-1], bars['close'].iloc[-1],
+                   bars['volume'].iloc[-1]) if len(bars) else None
+    with _price_lock:
+        cached = _indicator_memory.get(key)
+        lock = _indicator_locks.setdefault(key, threading.Lock())
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    with lock:
+        with _price_lock:
+            cached = _indicator_memory.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        path = _indicator_path(symbol, resolution)
+        if cached is not None:
+            previous = cached[1] if fingerprint and cached[0] and cached[0][0] == fingerprint[0] else None
+        else:
+            previous = pd.read_feather(path) if path.exists() else None
+        frame = indicators.update_indicators(bars, previous)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = get_temp_path(path)
+        try:
+            frame.to_feather(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        with _price_lock:
+            _indicator_memory[key] = (fingerprint, frame)
+    return frame
+
+
+# Overlay name -> (indicator columns, panel). Oscillators get their own panel below volume.
+OVERLAYS = {
+    "MA20": (["MA20"], "price"),
+    "MA50": (["MA50"], "price"),
+    "MA200": (["MA200"], "price"),
+    "EMA20": (["EMA20"], "price"),
+    "EMA50": (["EMA50"], "price"),
+    "Bollinger Bands": (["BB20_UPPER", "BB20_MID", "BB20_LOWER"], "price"),
+    "Volume MA20": (["VOL20"], "volume"),
+    "RSI14": (["RSI14"], "RSI14"),
+    "ATR14": (["ATR14"], "ATR14"),
+}
+
+def plot_ohlcv_candlestick(df, symbol, start_date = '2024-12-31', indicator_df=None, overlays=()):
+    """
+    Candlestick and volume chart. `indicator_df` (row-aligned with `df`, as
+    returned by get_price_indicators) supplies the selected `overlays`.
+    """
+    mask = (df['date'] >= start_date).to_numpy()
+    df_temp = df[mask].copy()
+    intraday = (df_temp['date'] != df_temp['date'].dt.normalize()).any()
+    df_temp['date'] = df_temp['date'].dt.strftime('%Y-%m-%d %H:%M' if intraday else '%Y-%m-%d')
+    panels = [OVERLAYS[o][1] for o in overlays if OVERLAYS[o][1] not in ("price", "volume")]
     fig = make_subplots(
-        rows=2, cols=1, 
+        rows=2 + len(panels), cols=1, 
         shared_xaxes=True, 
         vertical_spacing=0.03,
-        row_heights=[0.7, 0.3],
-        subplot_titles=[f"{symbol} Price Chart", "Volume"]
+        row_heights=[0.7, 0.3] + [0.25] * len(panels),
+        subplot_titles=[f"{symbol} Price Chart", "Volume"] + panels
     )
     # Candlestick
     fig.add_trace(
@@ -89,6 +365,17 @@ def plot_ohlcv_candlestick(df, symbol, start_date = '2024-12-31'):
             opacity=0.5
         ), row=2, col=1
     )
+    # Indicator overlays
+    if indicator_df is not None:
+        ind_temp = indicator_df[mask]
+        for overlay in overlays:
+            columns, panel = OVERLAYS[overlay]
+            row = {"price": 1, "volume": 2}.get(panel) or 3 + panels.index(panel)
+            for column in columns:
+                fig.add_trace(
+                    go.Scatter(x=df_temp['date'], y=ind_temp[column], mode='lines', name=column, line=dict(width=1)),
+                    row=row, col=1
+                )
     # Layout
     fig.update_layout(
         template='plotly_white',
@@ -98,7 +385,7 @@ def plot_ohlcv_candlestick(df, symbol, start_date = '2024-12-31'):
         yaxis2_title="Volume",
         xaxis_rangeslider_visible=False,  
         xaxis2_rangeslider_visible=False,
-        height=600,
+        height=600 + 200 * len(panels),
         showlegend=False
     )
     fig.update_xaxes(
@@ -114,14 +401,19 @@ two_years_ago = datetime.today() - pd.DateOffset(years=2)
 three_years_ago = datetime.today() - pd.DateOffset(years=3)
 five_years_ago = datetime.today() - pd.DateOffset(years=5)
 
-@st.cache_data
-def load_ticker_price(ticker, start_date, end_date=None):
+def load_ticker_price(ticker, start_date, end_date=None, resolution="1D", overlays=()):
     """
-    Load OHLCV data for a specific ticker.
+    Load OHLCV data for a specific ticker from the local price cache.
+    Returns the chart and the cache status of the bars behind it.
     """
-    df = fetch_ohlcv(ticker, start_date, end_date)
-    fig = plot_ohlcv_candlestick(df, ticker, start_date)
-    return fig
+    df, status = get_price_bars(ticker, resolution)
+    indicator_df = get_price_indicators(ticker, resolution, df) if overlays else None
+    if end_date is not None:
+        keep = (df['date'] <= end_date).to_numpy()
+        df = df[keep]
+        indicator_df = indicator_df[keep] if indicator_df is not None else None
+    fig = plot_ohlcv_candlestick(df, ticker, start_date, indicator_df, overlays)
+    return fig, status
 
 
 #%% Streamlit
@@ -131,7 +423,7 @@ def load_ticker_price(ticker, start_date, end_date=None):
 # start_date = st.date_input("Start Date (Default: YTD)", value=ytd)
 # if st.button("Load Data"):
 #     try:
-#         fig = load_ticker_price(ticker, start_date=start_date.strftime('%Y-%m-%d'))
+#         fig, _ = load_ticker_price(ticker, start_date=start_date.strftime('%Y-%m-%d'))
 #         st.plotly_chart(fig)
 #     except Exception as e:
 #         st.error(f"Error loading data: {e}")
\ No newline at end of file
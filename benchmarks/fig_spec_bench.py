@@ -0,0 +1,80 @@
+"""
+Figure construction: plotly.graph_objects vs. utils.fig_spec.
+
+Builds the dashboard's two chart shapes on synthetic data:
+- a 2-column bar grid like Bank_Dashboard.plot() (8 per Bank page run)
+- the 3-row valuation chart with 15 hlines like create_pe_pb_plot()
+
+Both end-to-end rows include what st.plotly_chart does before serializing:
+to_dict() on a Figure, or one Figure(**spec) validation pass on a dict.
+
+Run from the project root: python -m benchmarks.fig_spec_bench
+"""
+import timeit
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from utils.fig_spec import subplot_grid, trace, hline, figure
+
+rng = np.random.default_rng(0)
+periods = [f"{y}Q{q}" for y in range(2018, 2026) for q in range(1, 5)]
+table = pd.DataFrame(rng.normal(size=(10, len(periods))), index=[f"Metric {i}" for i in range(10)], columns=periods)
+dates = pd.date_range("2018-01-01", periods=1800)
+ratios = {m: pd.Series(rng.uniform(5, 20, len(dates)), index=dates) for m in ["P/E", "P/B", "P/S"]}
+
+
+#%% Bar grid
+def grid_go():
+    rows = table.shape[0] // 2 + 1
+    fig = make_subplots(rows=rows, cols=2, subplot_titles=table.index.tolist(), vertical_spacing=0.05)
+    for i, metric in enumerate(table.index):
+        fig.add_trace(go.Bar(x=table.columns, y=table.loc[metric], name=metric), row=i // 2 + 1, col=i % 2 + 1)
+    fig.update_layout(height=400 * rows, width=1200, showlegend=False)
+    return fig
+
+def grid_spec():
+    rows = table.shape[0] // 2 + 1
+    layout = subplot_grid(rows, 2, table.index.tolist(), vertical_spacing=0.05)
+    data = [trace('bar', i // 2 + 1, i % 2 + 1, 2, x=table.columns, y=table.loc[m], name=m) for i, m in enumerate(table.index)]
+    layout.update(height=400 * rows, width=1200, showlegend=False)
+    return figure(data, layout)
+
+
+#%% Valuation bands
+def bands_go():
+    fig = make_subplots(rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.05, subplot_titles=list(ratios))
+    for row, series in enumerate(ratios.values(), start=1):
+        fig.add_trace(go.Scatter(x=series.index, y=series, mode='lines', line=dict(color='green')), row=row, col=1)
+        mean, std = series.mean(), series.std()
+        for level in [mean, mean + std, mean - std, mean + 2 * std, mean - 2 * std]:
+            fig.add_hline(y=level, line_dash="dash", line_color="grey", row=row, col=1, line_width=1)
+    fig.update_layout(height=1200)
+    return fig
+
+def bands_spec():
+    layout = subplot_grid(3, 1, list(ratios), vertical_spacing=0.05, shared_xaxes=True)
+    data, shapes = [], []
+    for row, series in enumerate(ratios.values(), start=1):
+        data.append(trace('scatter', row, 1, 1, x=series.index, y=series, mode='lines', line=dict(color='green')))
+        mean, std = series.mean(), series.std()
+        for level in [mean, mean + std, mean - std, mean + 2 * std, mean - 2 * std]:
+            shapes.append(hline(level, row, 1, 1, dash='dash', color='grey', width=1))
+    layout.update(shapes=shapes, height=1200)
+    return figure(data, layout)
+
+
+def bench(name, fn, number=20):
+    seconds = min(timeit.repeat(fn, number=number, repeat=3)) / number
+    print(f"{name:<32}{seconds * 1e3:8.2f} ms")
+    return seconds
+
+
+if __name__ == "__main__":
+    for label, go_fn, spec_fn in [("bar grid", grid_go, grid_spec), ("valuation bands", bands_go, bands_spec)]:
+        t_go = bench(f"{label}: graph_objects", lambda: go_fn().to_dict())
+        t_spec = bench(f"{label}: spec", spec_fn)
+        t_both = bench(f"{label}: spec + validate", lambda: go.Figure(**spec_fn()).to_dict())
+        print(f"{label}: {t_go / t_both:.1f}x faster end to end\n")
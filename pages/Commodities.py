@@ -0,0 +1,70 @@
+#%%
+import streamlit as st
+import pandas as pd
+from utils.commodities import FREQUENCIES, load_store, series_label, series_view
+from utils.fig_spec import trace, figure
+
+LOOKBACKS = {'3M': pd.DateOffset(months=3), '6M': pd.DateOffset(months=6), '1Y': pd.DateOffset(years=1),
+             '3Y': pd.DateOffset(years=3), 'All': None}
+MA_STYLES = [dict(color='red', width=1, dash='dot'), dict(color='green', width=1, dash='dot'),
+             dict(color='orange', width=1, dash='dash')]
+
+#%% Site setup
+st.set_page_config(page_title="Commodities", layout="wide")
+st.title("Commodity Prices")
+
+store = load_store()
+if store.empty:
+    st.error("No commodity series found. Add a sheet to data/commodities and run "
+             "`python -m utils.commodities ingest`.")
+    st.stop()
+
+names = list(store['SERIES'].cat.categories)
+st.sidebar.header('Settings')
+selected = st.sidebar.multiselect('Series', options=names, default=names[:1], format_func=series_label)
+frequency = st.sidebar.radio('Frequency', options=list(FREQUENCIES), horizontal=True)
+lookback = st.sidebar.radio('Lookback', options=list(LOOKBACKS), index=0, horizontal=True)
+windows = st.sidebar.multiselect('Moving averages (bars)', options=[5, 10, 20, 50, 100, 200], default=[5, 20])
+
+if not selected:
+    st.info("Select at least one series.")
+    st.stop()
+
+#%% Chart
+last_date = store.loc[store['SERIES'].isin(selected), 'DATE'].max()
+start = None if LOOKBACKS[lookback] is None else last_date - LOOKBACKS[lookback]
+view = series_view(store, selected, frequency, tuple(sorted(windows)), start)
+
+# Several series are rebased to 100 at the start of the window so they share an axis
+rebase = len(selected) > 1
+data = []
+for name in selected:
+    rows = view[view['SERIES'] == name]
+    base = rows['VALUE'].iloc[0] / 100 if rebase and len(rows) else 1
+    data.append(trace('scatter', x=rows['DATE'], y=rows['VALUE'] / base, mode='lines',
+                      name=series_label(name), line=dict(width=2)))
+    if not rebase:
+        for window, style in zip(sorted(windows), MA_STYLES * len(windows)):
+            data.append(trace('scatter', x=rows['DATE'], y=rows[f'MA{window}'], mode='lines',
+                              name=f'{window}-bar MA', line=style))
+
+y_title = "Rebased (start = 100)" if rebase else series_label(selected[0])
+layout = dict(
+    title=dict(text=f"{frequency} prices ({lookback})", x=0.5, xanchor='center'),
+    xaxis=dict(title=dict(text="Date"), rangeslider=dict(visible=False)),
+    yaxis=dict(title=dict(text=y_title)),
+    template="plotly_white", height=600, hovermode='x unified',
+    legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='right', x=1),
+)
+st.plotly_chart(figure(data, layout), use_container_width=True)
+
+#%% Summary and raw data
+latest = view.groupby('SERIES', observed=True).agg(
+    Last=('VALUE', 'last'), First=('VALUE', 'first'), High=('VALUE', 'max'), Low=('VALUE', 'min'), Date=('DATE', 'last'))
+latest['Change (%)'] = (latest['Last'] / latest['First'] - 1) * 100
+latest.index = [series_label(n) for n in latest.index]
+st.dataframe(latest.drop(columns='First').style.format(
+    {'Last': '{:,.1f}', 'High': '{:,.1f}', 'Low': '{:,.1f}', 'Change (%)': '{:+.2f}', 'Date': '{:%Y-%m-%d}'}))
+
+with st.expander("Raw data"):
+    st.dataframe(view.sort_values(['SERIES', 'DATE'], ascending=[True, False]), hide_index=True)
@@ -0,0 +1,67 @@
+#%%
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from datetime import datetime
+from utils.price_analytics import (
+    BENCHMARK, get_sectors, get_universe, load_bar_frames, close_matrix, daily_returns, correlation_matrix,
+    beta_vol_summary, technical_snapshot
+)
+
+#%% Cached computations
+@st.cache_data
+def sector_list():
+    return get_sectors()
+
+@st.cache_data
+def sector_tickers(l2):
+    return tuple(get_universe(None if l2 == 'All' else l2))
+
+@st.cache_data(ttl=3600)
+def compute_price_analytics(tickers, start_date, window):
+    """
+    Correlation over the last `window` trading days plus beta/volatility vs.
+    the benchmark and latest technicals, for a tuple of tickers. Keyed on the
+    ticker tuple and parameters only, so reruns with the same selection are
+    cache hits.
+    """
+    frames = load_bar_frames(list(tickers) + [BENCHMARK])
+    close = close_matrix(frames, start_date)
+    if close.empty or BENCHMARK not in close.columns:
+        return pd.DataFrame(), pd.DataFrame()
+    returns = daily_returns(close.drop(columns=BENCHMARK)).iloc[-window:]
+    corr = correlation_matrix(returns, min_periods=min(60, window // 2))
+    summary = beta_vol_summary(close, BENCHMARK, window)
+    frames.pop(BENCHMARK)
+    summary = summary.join(technical_snapshot(frames))
+    return corr, summary
+
+
+#%% Site setup
+st.set_page_config(page_title="Price Correlation", layout="wide")
+st.title("Return Correlation & Beta")
+
+st.sidebar.header('Settings')
+L2 = st.sidebar.selectbox('Select Sector', options=['All'] + sector_list())
+window = st.sidebar.selectbox('Window (trading days)', options=[60, 120, 250], index=1)
+start_date = st.sidebar.date_input('Start Date', value=datetime(datetime.today().year - 2, 1, 1))
+
+tickers = sector_tickers(L2)
+st.write(f"{len(tickers)} tickers vs. {BENCHMARK}")
+
+with st.spinner("Loading prices..."):
+    corr, summary = compute_price_analytics(tickers, start_date.strftime('%Y-%m-%d'), window)
+
+if corr.empty:
+    st.warning("No price data available for the selected universe.")
+else:
+    st.subheader(f"Return Correlation (last {window} days)")
+    fig = px.imshow(
+        corr, zmin=-1, zmax=1, color_continuous_scale='RdBu_r',
+        aspect='auto', height=max(600, 12 * len(corr)),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.subheader(f"Beta, Volatility and Technicals vs. {BENCHMARK}")
+    st.dataframe(summary.style.format({'Beta': '{:.2f}', 'Volatility': '{:.1%}', 'Correlation': '{:.2f}', 'RSI14': '{:.0f}',
+                                       'vs MA50': '{:+.1%}', 'vs MA200': '{:+.1%}', 'ATR %': '{:.1%}'}))
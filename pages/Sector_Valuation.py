@@ -4,6 +4,7 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from utils.utils import get_data_path
+from utils.datasets import read_dataset
 
 #%% Data preparation
 # Import all L2
@@ -28,7 +29,7 @@ def sector_ticker_list():
 sector_dict = sector_ticker_list()
 
 # Valuation data
-df = pd.read_csv(get_data_path("Val_processed.csv"))
+df = read_dataset("Val_processed.csv")
 df['TRADE_DATE'] = pd.to_datetime(df['TRADE_DATE'])
 
 
@@ -0,0 +1,51 @@
+#%%
+import streamlit as st
+import pandas as pd
+from utils.datasets import read_dataset, dataset_version
+from utils.screener import OPERATORS, build_screener_table, screen, rank
+
+#%% Data preparation
+@st.cache_data
+def load_screener_table(version):
+    """
+    Latest-snapshot table for the whole universe, rebuilt only when the
+    underlying datasets change (`version` is their change token).
+    """
+    fa = read_dataset("FA_processed.csv")
+    val = read_dataset("Val_processed.csv")
+    mcap = read_dataset("MktCap_processed.csv")
+    return build_screener_table(fa, val, mcap)
+
+#%% Site setup
+st.set_page_config(page_title="Stock Screener", layout="wide")
+st.title("Stock Screener")
+
+table = load_screener_table(tuple(dataset_version(f) for f in ["FA_processed.csv", "Val_processed.csv", "MktCap_processed.csv"]))
+if table.empty:
+    st.warning("No tickers with a complete snapshot to screen.")
+    st.stop()
+metrics = [c for c in table.columns if c not in ('L2', 'PERIOD')]
+st.write("Money items in bn VND, margins and YoY growth in %, market cap as reported.")
+
+st.sidebar.header('Universe')
+sectors = st.sidebar.multiselect('Sectors (L2)', options=sorted(table['L2'].dropna().unique()))
+rank_by = st.sidebar.selectbox('Rank By', options=metrics, index=metrics.index('M_CAP') if 'M_CAP' in metrics else 0)
+ascending = st.sidebar.checkbox('Ascending', value=False)
+top = st.sidebar.number_input('Show Top', min_value=min(10, len(table)), max_value=len(table), value=min(50, len(table)), step=10)
+
+st.subheader('Conditions')
+conditions_df = st.data_editor(
+    pd.DataFrame([{'Metric': 'P/E', 'Operator': '<', 'Value': 15.0}]),
+    column_config={
+        'Metric': st.column_config.SelectboxColumn(options=metrics, required=True),
+        'Operator': st.column_config.SelectboxColumn(options=list(OPERATORS), required=True),
+        'Value': st.column_config.NumberColumn(required=True),
+    },
+    num_rows='dynamic',
+    key='screener_conditions',
+)
+conditions = conditions_df.dropna().itertuples(index=False, name=None)
+
+result = rank(screen(table, conditions, sectors), rank_by, ascending=ascending, top=top)
+st.subheader(f"Results ({len(result)} shown)")
+st.dataframe(result.style.format(precision=2), use_container_width=True)
@@ -0,0 +1,88 @@
+#%%
+import streamlit as st
+import pandas as pd
+from utils.backtest import METRICS, run_backtest
+from utils.datasets import read_dataset
+from utils.fig_spec import trace, figure
+from utils.price_analytics import get_sectors, get_universe, load_close_matrix
+from utils.utils import get_data_path
+
+#%% Cached computations
+@st.cache_data
+def sector_list():
+    return get_sectors()
+
+@st.cache_data(ttl=3600)
+def close_matrix(tickers, start_date):
+    return load_close_matrix(list(tickers), start_date)
+
+@st.cache_data(ttl=3600)
+def compute_backtest(tickers, start_date, metric, entry, exit, side, min_periods, cost_bps):
+    """
+    Band backtest over a tuple of tickers. Keyed on the selection and rule
+    parameters only, so changing a table sort or chart option is a cache hit.
+    """
+    val = read_dataset("Val_processed.csv")
+    val = val[val['TICKER'].isin(tickers)]
+    close = close_matrix(tickers, start_date)
+    if close.empty:
+        return None
+    return run_backtest(val, close, metric, entry, exit, side, min_periods, cost_bps)
+
+
+#%% Site setup
+st.set_page_config(page_title="Valuation Band Backtest", layout="wide")
+st.title("Valuation Band Backtest")
+st.caption("Mean reversion on the P/E, P/B and P/S bands of the Company page. Bands use the expanding "
+           "mean/std up to the previous day; positions earn the next day's return.")
+
+if not get_data_path("Val_processed.csv").exists():
+    st.error("Val_processed.csv not found in data/.")
+    st.stop()
+
+st.sidebar.header('Settings')
+L2 = st.sidebar.selectbox('Sector', options=['All'] + sector_list())
+metric = st.sidebar.selectbox('Metric', options=METRICS)
+side = st.sidebar.radio('Side', options=['long', 'short'], horizontal=True,
+                        help="Long buys below the band; short sells above its mirror image.")
+entry = st.sidebar.select_slider('Entry (z)', options=[-3.0, -2.5, -2.0, -1.5, -1.0, -0.5], value=-1.0)
+exit = st.sidebar.select_slider('Exit (z)', options=[-0.5, 0.0, 0.5, 1.0, 1.5, 2.0], value=0.0)
+min_periods = st.sidebar.number_input('Min. history (days)', min_value=20, max_value=1000, value=250, step=10)
+cost_bps = st.sidebar.number_input('Cost per trade side (bps)', min_value=0.0, max_value=100.0, value=15.0, step=5.0)
+start_date = st.sidebar.date_input('Start date', value=pd.Timestamp('2018-01-01'))
+
+if entry >= exit:
+    st.warning("Entry must be below exit.")
+    st.stop()
+
+tickers = tuple(get_universe(None if L2 == 'All' else L2))
+with st.spinner(f"Backtesting {len(tickers)} tickers..."):
+    result = compute_backtest(tickers, str(start_date), metric, entry, exit, side, int(min_periods), float(cost_bps))
+if result is None or result['tickers'].empty:
+    st.warning("No overlapping valuation and price history for this selection.")
+    st.stop()
+
+#%% Sector results
+pct = {'HIT_RATE': '{:.0%}', 'AVG_TRADE': '{:+.1%}', 'RETURN': '{:+.1%}', 'CAGR': '{:+.1%}', 'MAX_DD': '{:.1%}',
+       'MEDIAN_TICKER': '{:+.1%}', 'BUY_HOLD': '{:+.1%}', 'EXPOSURE': '{:.0%}'}
+
+st.subheader("By sector")
+st.caption("Equal-weight portfolio of each sector's tickers; hit rate and average trade pool all the sector's trades.")
+sectors = result['sectors']
+st.dataframe(sectors.style.format({k: v for k, v in pct.items() if k in sectors.columns}, na_rep=''))
+
+equity = result['equity']
+data = [trace('scatter', x=equity.index, y=equity[s], mode='lines', name=str(s)) for s in equity.columns]
+layout = dict(title=dict(text=f"Sector equity curves ({metric}, {side}, entry {entry}, exit {exit})"),
+              yaxis=dict(title=dict(text="Growth of 1")), template="plotly_white", height=550)
+st.plotly_chart(figure(data, layout), use_container_width=True)
+
+#%% Ticker results
+st.subheader("By ticker")
+tickers_table = result['tickers'].sort_values('RETURN', ascending=False)
+st.dataframe(tickers_table.style.format({k: v for k, v in pct.items() if k in tickers_table.columns}, na_rep=''))
+
+with st.expander("Trades"):
+    trades = result['trades'].sort_values('ENTRY', ascending=False)
+    st.dataframe(trades.style.format({'RETURN': '{:+.1%}', 'ENTRY': '{:%Y-%m-%d}', 'EXIT': '{:%Y-%m-%d}'}),
+                 hide_index=True)
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.backtest import backtest, run_backtest
+
+
+def _frames(days=600, tickers=6, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2018-01-01", periods=days)
+    columns = [f"T{i}" for i in range(tickers)]
+    close = pd.DataFrame(np.exp(np.cumsum(rng.normal(0, 0.02, (days, tickers)), 0)) * 20, dates, columns)
+    values = pd.DataFrame(np.exp(np.cumsum(rng.normal(0, 0.03, (days, tickers)), 0)) * 15, dates, columns)
+    return values, close
+
+
+@pytest.mark.parametrize("side", ["long", "short"])
+def test_trade_returns_compound_to_the_equity_curve(side):
+    values, close = _frames()
+    strat, held, trades = backtest(values, close, entry=-0.5, exit=0.5, side=side, min_periods=60, cost_bps=25)
+    assert len(trades) > 10
+    growth = (1 + trades['RETURN']).groupby(trades['TICKER']).prod().reindex(close.columns, fill_value=1.0)
+    np.testing.assert_allclose(growth, (1 + strat).prod(), rtol=1e-9)
+
+def test_round_trip_pays_both_sides():
+    dates = pd.bdate_range("2020-01-01", periods=8)
+    close = pd.DataFrame({'A': 100.0}, index=dates)
+    values = pd.DataFrame({'A': [10, 12, 10, 12, 1, 30, 30, 30]}, index=dates, dtype='float64')
+    strat, held, trades = backtest(values, close, entry=-1.0, exit=0.0, min_periods=4, cost_bps=50)
+    assert len(trades) == 1
+    assert trades['RETURN'].iloc[0] == pytest.approx(-2 * 0.005)  # flat price: entry + exit cost
+    assert (1 + strat['A']).prod() - 1 == pytest.approx(trades['RETURN'].iloc[0])
+
+def test_run_backtest_summaries():
+    values, close = _frames(tickers=8)
+    val = values.stack().rename('P/E').rename_axis(['TRADE_DATE', 'TICKER']).reset_index()
+    sectors = {t: 'X' if i % 2 else 'Y' for i, t in enumerate(close.columns)}
+    result = run_backtest(val, close, 'P/E', -1.0, 0.0, min_periods=60, cost_bps=10, sectors=sectors)
+    assert list(result['sectors'].index.sort_values()) == ['X', 'Y']
+    assert result['sectors']['TRADES'].sum() == len(result['trades'])
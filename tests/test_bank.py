@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from utils.bank import _parse, to_numeric
+
+
+def test_parse_arrow_strings():
+    series = pd.Series(['74,124.4', None, '4.26%', '-1,000'], dtype=pd.ArrowDtype(pa.string()))
+    np.testing.assert_array_equal(_parse(series).to_numpy(), [74124.4, np.nan, 4.26, -1000.0])
+
+def test_parse_numeric_passthrough():
+    series = pd.Series([1.5, None], dtype=pd.ArrowDtype(pa.float64()))
+    assert _parse(series).dtype == 'float64'
+    np.testing.assert_array_equal(_parse(series).to_numpy(), [1.5, np.nan])
+
+def test_to_numeric_arrow_frame():
+    frame = pd.DataFrame({
+        'TICKER': ['VCB', 'BID'],
+        'YEARREPORT': [2024, 2024],
+        'LENGTHREPORT': [5, 5],
+        'BS.1': ['74,124.4', '1,000'],
+        'CA.1': ['4.26%', '110.03%'],
+    }).astype({'TICKER': pd.ArrowDtype(pa.string()), 'BS.1': pd.ArrowDtype(pa.string()),
+               'CA.1': pd.ArrowDtype(pa.string())})
+    numeric = to_numeric(frame, {'CA.1': 'pct'}, formatted=True)
+    np.testing.assert_allclose(numeric['BS.1'], [74124.4, 1000.0])
+    np.testing.assert_allclose(numeric['CA.1'], [0.0426, 1.1003])
+
+def test_annual_display_shared_read(tmp_path, monkeypatch):
+    from utils import datasets
+    from utils.bank import _annual_display, ca_pct_codes
+    from utils.utils import get_data_path
+
+    monkeypatch.setenv("DASHBOARD_DATA_MODE", "shared")
+    monkeypatch.setattr(datasets, "get_shared_data_path", lambda filename: tmp_path / filename.replace(".csv", ".arrow"))
+    monkeypatch.setattr(datasets, "get_manifest_path", lambda filename: tmp_path / "missing.json")
+    datasets.write_shared(get_data_path("df_a_full_formatted.csv"), tmp_path / "df_a_full_formatted.arrow")
+    frame = datasets.read_dataset("df_a_full_formatted.csv")
+    assert isinstance(frame['TICKER'].dtype, pd.ArrowDtype)
+
+    display = _annual_display(frame)
+    pct = [c for c in ca_pct_codes() if c in display.columns]
+    assert pct
+    for col in pct:
+        assert pd.api.types.is_numeric_dtype(display[col]), col
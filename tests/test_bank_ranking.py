@@ -0,0 +1,24 @@
+import pandas as pd
+
+from utils import bank, datasets
+from utils.bank_ranking import bank_position, load_rank_table
+from utils.utils import get_data_path
+
+
+def test_rank_table_from_shared_read(tmp_path, monkeypatch):
+    monkeypatch.setenv("DASHBOARD_DATA_MODE", "shared")
+    monkeypatch.setattr(datasets, "get_shared_data_path", lambda filename: tmp_path / filename.replace(".csv", ".arrow"))
+    # Read the Arrow copy even if a partition store has been seeded locally
+    monkeypatch.setattr(datasets, "get_manifest_path", lambda filename: tmp_path / "missing.json")
+    for filename in ["df_q_full.csv", "df_a_full_formatted.csv"]:
+        datasets.write_shared(get_data_path(filename), datasets.get_shared_data_path(filename))
+    assert isinstance(datasets.read_dataset("df_q_full.csv")['TICKER'].dtype, pd.ArrowDtype)
+
+    classification = bank.load_classification()
+    for frequency in ['quarterly', 'annual']:
+        ranks = load_rank_table(frequency, classification)
+        assert len(ranks) and ranks['VALUE'].notna().all()
+        assert (ranks['INDUSTRY_RANK'] <= ranks['INDUSTRY_N']).all()
+        ticker = classification['TICKER'].iloc[0]
+        percentile, rank, peers = bank_position(ranks, ticker, keycodes=['BS.1'])
+        assert percentile.shape[0] == 1
@@ -0,0 +1,17 @@
+import inspect
+
+from utils import build, datasets
+
+
+def test_step_hash_tracks_dependency_modules(monkeypatch):
+    step = next(s for s in build.STEPS if s.name == "shared:df_q_full.csv")
+    before = build._step_hash(step)
+    getsource = inspect.getsource
+    monkeypatch.setattr(build.inspect, "getsource",
+                        lambda obj: getsource(obj) + ("# edited" if obj is datasets else ""))
+    assert build._step_hash(step) != before
+
+def test_default_build_does_not_rewrite_data():
+    data_dir = build.get_data_path("")
+    for step in build._select(()):
+        assert all(path.parent != data_dir for path in step.outputs), step.name
@@ -0,0 +1,72 @@
+import pandas as pd
+
+from utils.cache import cache_stats, derive, get_version, set_version, versioned_cache
+
+
+def _counted(maxsize=128):
+    calls = []
+
+    @versioned_cache(maxsize)
+    def total(frame, column):
+        calls.append(column)
+        return frame[column].sum()
+    return total, calls
+
+def test_same_token_hits():
+    total, calls = _counted()
+    frame = set_version(pd.DataFrame({'A': [1, 2]}), ('a.csv', 1))
+    # Another object with the same token is the same dataset version
+    same = set_version(pd.DataFrame({'A': [1, 2]}), ('a.csv', 1))
+    assert total(frame, 'A') == total(same, 'A') == 3
+    assert calls == ['A']
+    assert total.cache_info()['hits'] == 1
+
+def test_new_version_misses():
+    total, calls = _counted()
+    assert total(set_version(pd.DataFrame({'A': [1, 2]}), ('a.csv', 1)), 'A') == 3
+    assert total(set_version(pd.DataFrame({'A': [5, 5]}), ('a.csv', 2)), 'A') == 10
+    assert calls == ['A', 'A']
+
+def test_untagged_frame_runs_uncached():
+    total, calls = _counted()
+    frame = pd.DataFrame({'A': [1, 2]})
+    assert get_version(frame) is None
+    total(frame, 'A')
+    total(frame, 'A')
+    assert calls == ['A', 'A']
+    assert total.cache_info()['uncached'] == 2
+
+def test_derived_token_is_keyed_on_the_step():
+    total, calls = _counted()
+    frame = set_version(pd.DataFrame({'A': [1, 2, 3]}), ('a.csv', 1))
+    first = derive(frame[frame['A'] >= 2], frame, 'A>=', 2)
+    again = derive(frame[frame['A'] >= 2], frame, 'A>=', 2)
+    other = derive(frame[frame['A'] >= 3], frame, 'A>=', 3)
+    assert get_version(first) == (('a.csv', 1), ('A>=', 2))
+    assert total(first, 'A') == total(again, 'A') == 5
+    assert total(other, 'A') == 3
+    assert calls == ['A', 'A']
+    # Deriving from an untagged parent leaves the frame untagged
+    assert get_version(derive(pd.DataFrame(), pd.DataFrame(), 'x')) is None
+
+def test_lru_eviction():
+    total, calls = _counted(maxsize=2)
+    frames = [set_version(pd.DataFrame({'A': [i]}), ('a.csv', i)) for i in range(3)]
+    for frame in frames:
+        total(frame, 'A')
+    total(frames[0], 'A')  # evicted by the third
+    total(frames[2], 'A')
+    info = total.cache_info()
+    assert (info['misses'], info['hits'], info['evictions'], info['size']) == (4, 1, 2, 2)
+
+def test_results_are_tagged_and_registered():
+    @versioned_cache()
+    def doubled(frame):
+        return frame * 2
+
+    frame = set_version(pd.DataFrame({'A': [1]}), ('a.csv', 1))
+    result = doubled(frame)
+    assert get_version(result) is not None
+    assert doubled(frame) is result
+    stats = cache_stats()[f"{doubled.__module__}.{doubled.__qualname__}"]
+    assert (stats['hits'], stats['misses']) == (1, 1)
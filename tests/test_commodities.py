@@ -0,0 +1,48 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from utils import commodities
+from utils.utils import get_project_root
+
+
+@pytest.fixture
+def commodity_dir(tmp_path, monkeypatch):
+    shutil.copy(get_project_root() / "data" / "commodities" / "China_hrc.xlsx", tmp_path)
+    monkeypatch.setattr(commodities, "get_commodity_dir", lambda: tmp_path)
+    monkeypatch.setattr(commodities, "_store", None)
+    return tmp_path
+
+
+def test_concurrent_first_loads_ingest_once(commodity_dir, monkeypatch):
+    calls = []
+    ingest = commodities.ingest
+    monkeypatch.setattr(commodities, "ingest", lambda paths=None: calls.append(1) or ingest(paths))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        stores = list(pool.map(lambda _: commodities.load_store(), range(8)))
+    assert len(calls) == 1
+    assert all(len(s) == len(stores[0]) > 2000 for s in stores)
+    assert not list(commodity_dir.glob("*.tmp")) and not list(commodity_dir.glob(".*.tmp"))
+
+def test_ingest_upserts_revisions(commodity_dir):
+    commodities.ingest()
+    revised = pd.DataFrame({'Date': pd.to_datetime(['2025-07-21', '2025-07-22']), 'CDSPHRAV Index': [3400.0, 3420.0]})
+    revised.to_excel(commodity_dir / "update.xlsx", index=False)
+    counts = commodities.ingest([commodity_dir / "update.xlsx"])
+    assert counts == {'CDSPHRAV Index': 2}
+    store = commodities.load_store()
+    tail = store.set_index('DATE')['VALUE']
+    assert tail[pd.Timestamp('2025-07-21')] == 3400.0 and tail[pd.Timestamp('2025-07-22')] == 3420.0
+
+def test_unchanged_sheet_is_not_reparsed(commodity_dir, monkeypatch):
+    commodities.load_store()
+    sheet = commodity_dir / "China_hrc.xlsx"
+    os.utime(sheet)  # touched but not edited
+    assert commodities.ingest() == {}
+    calls = []
+    monkeypatch.setattr(commodities, "ingest", lambda paths=None: calls.append(1))
+    commodities.load_store()
+    assert calls == []
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.indicators import INDICATORS, compute_indicators, compute_indicators_batch, update_indicators
+from utils.price_analytics import technical_snapshot
+
+
+def _bars(seed, n=400):
+    rng = np.random.default_rng(seed)
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return pd.DataFrame({
+        'date': pd.bdate_range("2022-01-03", periods=n),
+        'open': close * (1 + rng.normal(0, 0.005, n)),
+        'high': close * 1.01, 'low': close * 0.99, 'close': close,
+        'volume': rng.integers(1_000, 10_000, n),
+    })
+
+
+def test_batch_matches_single_symbol():
+    frames = {f"T{i}": _bars(i) for i in range(4)}
+    wide = compute_indicators_batch(frames)
+    for symbol, bars in frames.items():
+        single = compute_indicators(bars).set_index('date')
+        for column in single.columns:
+            np.testing.assert_allclose(wide[column][symbol].to_numpy(), single[column].to_numpy(), rtol=1e-10)
+
+def test_incremental_update_matches_full_computation():
+    bars = _bars(7)
+    cached = compute_indicators(bars.iloc[:300])
+    updated = update_indicators(bars, cached)
+    full = compute_indicators(bars)
+    pd.testing.assert_frame_equal(updated, full, rtol=1e-8)
+
+def test_technical_snapshot():
+    frames = {f"T{i}": _bars(i) for i in range(3)}
+    snapshot = technical_snapshot(frames)
+    assert list(snapshot.index) == list(frames)
+    bars = frames["T1"]
+    assert snapshot.loc["T1", 'vs MA200'] == pytest.approx(bars['close'].iloc[-1] / bars['close'].iloc[-200:].mean() - 1)
+    assert snapshot['RSI14'].between(0, 100).all()
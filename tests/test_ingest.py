@@ -0,0 +1,85 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import bank, ingest, partitions
+
+CA_FORMAT = {'CA.1': 'pct', 'CA.2': 'pct', 'CA.4': 'abs'}
+
+
+def _bank_row(ticker, year, quarter, loans, deposits, npl):
+    return {'ORGANCODE': ticker, 'TICKER': ticker, 'YEARREPORT': year, 'LENGTHREPORT': quarter,
+            'BS.13': loans, 'BS.56': deposits, 'CA.1': loans / deposits, 'CA.2': 0.2, 'CA.4': npl}
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(partitions, "get_partition_dir", lambda filename: tmp_path / filename.split('.')[0])
+    monkeypatch.setattr(bank, "load_classification",
+                        lambda: pd.DataFrame({'TICKER': ['AAA', 'BBB', 'CCC'], 'GROUP': ['1', '1', '2']}))
+    monkeypatch.setattr(bank, "load_keycode_mapping", lambda: pd.DataFrame(
+        {'KeyCode': list(CA_FORMAT), 'Format': list(CA_FORMAT.values())}))
+    frame = pd.DataFrame([_bank_row('AAA', 2024, 4, 100.0, 80.0, 2e9), _bank_row('BBB', 2024, 4, 50.0, 40.0, 1e9),
+                          _bank_row('CCC', 2024, 4, 10.0, 20.0, 5e8), _bank_row('AAA', 2025, 1, 110.0, 90.0, 3e9)])
+    partitions.seed("df_q_full.csv", frame)
+    return frame
+
+def test_seed_read_round_trip(store):
+    manifest = partitions.read_manifest("df_q_full.csv")
+    assert sorted(manifest['partitions']) == ['2024Q4', '2025Q1']
+    assert manifest['partitions']['2024Q4']['file'] == '2024Q4.1.arrow'
+    stored = partitions.read_store(partitions.get_manifest_path("df_q_full.csv"))
+    pd.testing.assert_frame_equal(stored, store)
+
+def test_shared_read_is_arrow_backed(store):
+    stored = partitions.read_store(partitions.get_manifest_path("df_q_full.csv"), shared=True)
+    assert isinstance(stored['TICKER'].dtype, pd.ArrowDtype)
+    np.testing.assert_allclose(stored['BS.13'].astype('float64'), store['BS.13'])
+
+def test_upsert_existing_period_bumps_generation(store):
+    ingest.ingest("df_q_full.csv", pd.DataFrame([_bank_row('AAA', 2025, 1, 120.0, 100.0, 4e9)]), allow_gaps=True)
+    manifest = partitions.read_manifest("df_q_full.csv")
+    assert manifest['generation'] == 2
+    assert manifest['partitions']['2025Q1']['file'] == '2025Q1.2.arrow'
+    assert manifest['partitions']['2024Q4']['file'] == '2024Q4.1.arrow'
+    # The superseded partition file is collected
+    directory = partitions.get_partition_dir("df_q_full.csv")
+    assert sorted(p.name for p in directory.glob("*.arrow")) == ['2024Q4.1.arrow', '2025Q1.2.arrow']
+    period = partitions.read_period("df_q_full.csv", '2025Q1').set_index('TICKER')
+    assert period.loc['AAA', 'BS.13'] == 120.0
+    assert period.loc['INDUSTRY', 'BS.13'] == 120.0
+
+def test_new_period_group_rows(store):
+    rows = pd.DataFrame([_bank_row('AAA', 2025, 2, 100.0, 50.0, 2e9), _bank_row('BBB', 2025, 2, 60.0, 30.0, 1e9),
+                         _bank_row('CCC', 2025, 2, 40.0, 20.0, 1e9)])
+    # CA.2 (CASA) has no formula and the extract has no group rows
+    with pytest.raises(ValueError, match="2025Q2 INDUSTRY CA.2"):
+        ingest.ingest("df_q_full.csv", rows)
+    assert '2025Q2' not in partitions.read_manifest("df_q_full.csv")['partitions']
+
+    assert ingest.ingest("df_q_full.csv", rows, allow_gaps=True) == ['2025Q2']
+    period = partitions.read_period("df_q_full.csv", '2025Q2').set_index('TICKER')
+    assert period.loc['INDUSTRY', 'BS.13'] == 200.0
+    assert period.loc['INDUSTRY', 'CA.4'] == 4e9
+    assert period.loc['INDUSTRY', 'CA.1'] == pytest.approx(200.0 / 100.0)
+    assert period.loc['1', 'CA.1'] == pytest.approx(160.0 / 80.0)
+    assert period.loc['2', 'BS.56'] == 20.0
+    assert np.isnan(period.loc['INDUSTRY', 'CA.2'])
+
+def test_formatted_group_ratios():
+    classification = pd.DataFrame({'TICKER': ['AAA', 'BBB'], 'GROUP': ['1', '1']})
+    period = pd.DataFrame({'TICKER': ['AAA', 'BBB'], 'YEARREPORT': [2024, 2024], 'LENGTHREPORT': [5, 5],
+                           'BS.13': ['1,000.0', '500.0'], 'BS.56': ['800.0', '700.0'], 'CA.4': ['20.0', '10.0'],
+                           'CA.1': ['125.00%', '71.43%']})
+    out, gaps = ingest.bank_group_rows(period, classification, {'CA.1': 'pct', 'CA.4': 'abs'}, formatted=True)
+    industry = out.set_index('TICKER').loc['INDUSTRY']
+    assert gaps == []
+    assert industry['BS.13'] == '1,500.0'
+    assert industry['CA.4'] == '30.0'
+    assert industry['CA.1'] == '100.00%'
+
+def test_manifest_written_without_fixed_temp(store):
+    directory = partitions.get_partition_dir("df_q_full.csv")
+    assert not list(directory.glob("*.tmp")) and not list(directory.glob(".*.tmp"))
+    assert json.loads((directory / "manifest.json").read_text())['generation'] == 1
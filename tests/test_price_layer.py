@@ -0,0 +1,94 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import SSI_API
+from utils import price_store
+
+
+def _history(n=300, start=1_600_000_000):
+    t = (start + 86400 * np.arange(n)).tolist()
+    close = (20 + np.arange(n) * 0.1).tolist()
+    return {"code": "SUCCESS", "data": {"t": t, "o": close, "h": close, "l": close, "c": close, "v": [1000] * n}}
+
+@pytest.fixture
+def price_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_store, "get_store_dir", lambda symbol, resolution: tmp_path / resolution / symbol)
+    monkeypatch.setattr(SSI_API, "_price_memory", {})
+    monkeypatch.setattr(SSI_API, "_indicator_memory", {})
+    return tmp_path
+
+
+def test_concurrent_cold_loads_share_one_fetch(price_dir, monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def get_history(symbol, from_unix, to_unix, resolution="1D"):
+        with lock:
+            calls.append(symbol)
+        time.sleep(0.2)
+        return _history()
+    monkeypatch.setattr(SSI_API, "get_history", get_history)
+
+    with ThreadPoolExecutor(max_workers=40) as pool:
+        results = list(pool.map(lambda _: SSI_API.get_price_bars("AAA")[0], range(40)))
+    assert len(calls) == 1
+    assert all(len(bars) == 300 for bars in results)
+    assert not list(price_dir.rglob("*.tmp"))
+
+def test_concurrent_writes_to_the_same_partition(price_dir):
+    bars = price_store.to_compact(SSI_API.parse_history(_history()))
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(lambda _: price_store.write_bars("AAA", "1D", bars), range(32)))
+    assert len(price_store.read_bars("AAA", "1D")) == 300
+    assert not list(price_dir.rglob("*.tmp"))
+
+def test_concurrent_indicator_updates(price_dir, monkeypatch):
+    monkeypatch.setattr(SSI_API, "get_history", lambda *args, **kwargs: _history())
+    bars, _ = SSI_API.get_price_bars("AAA")
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        frames = list(pool.map(lambda n: SSI_API.get_price_indicators("AAA", "1D", bars.iloc[:250 + n]), range(12)))
+    assert [len(f) for f in frames] == [250 + n for n in range(12)]
+    assert not list(price_dir.rglob("*.tmp"))
+
+def _range_stub(history):
+    def get_history(symbol, from_unix, to_unix, resolution="1D"):
+        d = history["data"]
+        keep = [i for i, t in enumerate(d["t"]) if from_unix <= t <= to_unix]
+        return {"code": "SUCCESS", "data": {k: [v[i] for i in keep] for k, v in d.items()}}
+    return get_history
+
+def test_refresh_reloads_adjusted_history(price_dir, monkeypatch):
+    start = int(time.time()) - 86400 * 400
+    monkeypatch.setattr(SSI_API, "PRICE_HISTORY_START", time.strftime("%Y-%m-%d", time.localtime(start - 86400)))
+    monkeypatch.setattr(SSI_API, "get_history", _range_stub(_history(300, start)))
+    bars, _ = SSI_API.get_price_bars("AAA")
+    SSI_API.get_price_indicators("AAA", "1D", bars)
+    SSI_API.get_price_indicators("AAA", "1W", SSI_API.get_price_bars("AAA", "1W")[0])
+
+    # Only new bars: the stored history is kept
+    history = _history(305, start)
+    monkeypatch.setattr(SSI_API, "get_history", _range_stub(history))
+    SSI_API._refresh_bars("AAA", "1D")
+    assert price_store.read_bars("AAA", "1D")["c"].iloc[0] == pytest.approx(20.0)
+
+    # A 2:1 split before bar 303 rescales the earlier history
+    for field in "ohlc":
+        history["data"][field] = [v / 2 if i < 303 else v for i, v in enumerate(history["data"][field])]
+    SSI_API._refresh_bars("AAA", "1D")
+    stored = price_store.read_bars("AAA", "1D")
+    assert len(stored) == 305
+    np.testing.assert_allclose(stored["c"], history["data"]["c"], rtol=1e-6)
+    bars, _ = SSI_API.get_price_bars("AAA")
+    refreshed = SSI_API.get_price_indicators("AAA", "1D", bars)
+    np.testing.assert_allclose(refreshed["MA20"].iloc[-100:], bars["close"].rolling(20).mean().iloc[-100:], rtol=1e-6)
+
+    # A fresh process (no memory cache) must not splice onto pre-split weekly indicators
+    monkeypatch.setattr(SSI_API, "_indicator_memory", {})
+    monkeypatch.setattr(SSI_API, "_price_memory", {})
+    weekly, _ = SSI_API.get_price_bars("AAA", "1W")
+    indicators = SSI_API.get_price_indicators("AAA", "1W", weekly)
+    np.testing.assert_allclose(indicators["MA20"].iloc[20:], weekly["close"].rolling(20).mean().iloc[20:], rtol=1e-6)
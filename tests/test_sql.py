@@ -0,0 +1,21 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils import sql
+
+
+@pytest.mark.parametrize("statement", [
+    "DROP TABLE bank_quarterly",
+    "SELECT 1; SELECT 2",
+    "COPY bank_quarterly TO 'out.csv'",
+])
+def test_user_query_rejects_non_select(statement):
+    with pytest.raises(ValueError):
+        sql.run_user_query(statement)
+
+def test_concurrent_user_queries():
+    query = 'SELECT TICKER, COUNT(*) AS n FROM bank_quarterly GROUP BY TICKER'
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: len(sql.run_user_query(query)), range(16)))
+    assert len(set(results)) == 1 and results[0] > 0
@@ -0,0 +1,93 @@
+import json
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import SSI_API
+
+BODY = json.dumps({"code": "SUCCESS", "data": {"t": [1], "o": [1], "h": [1], "l": [1], "c": [1], "v": [1]}}).encode()
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """
+    Local HTTP server that sends BODY one byte every `delay` seconds and
+    counts the requests it served and the most it served at once.
+    """
+    settings = {"delay": 0.0, "hits": 0, "active": 0, "peak": 0}
+    counter = threading.Lock()
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(16)
+
+    def handle(conn):
+        with conn:
+            conn.recv(4096)
+            with counter:
+                settings["hits"] += 1
+                settings["active"] += 1
+                settings["peak"] = max(settings["peak"], settings["active"])
+            conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: %d\r\n\r\n" % len(BODY))
+            try:
+                for byte in BODY[:-1]:
+                    conn.sendall(bytes([byte]))
+                    time.sleep(settings["delay"])
+            except OSError:
+                pass
+            finally:
+                # Before the last byte: the client cannot have freed its slot yet
+                with counter:
+                    settings["active"] -= 1
+            try:
+                conn.sendall(BODY[-1:])
+            except OSError:
+                pass
+
+    def serve():
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=serve, daemon=True).start()
+    monkeypatch.setattr(SSI_API, "SSI_HISTORY_URL", f"http://127.0.0.1:{listener.getsockname()[1]}/")
+    yield settings
+    listener.close()
+
+
+def test_trickling_response_is_cut_at_the_deadline(server, monkeypatch):
+    monkeypatch.setattr(SSI_API, "REQUEST_TIMEOUT", 1.0)
+    server["delay"] = 0.05  # the whole body would take several seconds
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        SSI_API.get_history("AAA", 0, 1)
+    assert time.monotonic() - start < 1.5
+
+def test_followers_share_the_leaders_outcome(server, monkeypatch):
+    monkeypatch.setattr(SSI_API, "REQUEST_TIMEOUT", 3.0)
+    server["delay"] = 1.5 / len(BODY)  # finishes inside the budget
+
+    def call(i):
+        time.sleep(0.05 * i)  # followers join after the leader started
+        return SSI_API.get_history("AAA", 0, 2)["code"]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert list(pool.map(call, range(8))) == ["SUCCESS"] * 8
+    assert server["hits"] == 1
+
+def test_upstream_requests_are_capped(server, monkeypatch):
+    monkeypatch.setattr(SSI_API, "REQUEST_TIMEOUT", 5.0)
+    monkeypatch.setattr(SSI_API, "_upstream_slots", threading.BoundedSemaphore(2))
+    server["delay"] = 0.3 / len(BODY)
+
+    # Distinct symbols, so single-flight does not merge them
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        codes = list(pool.map(lambda i: SSI_API.get_history(f"T{i}", 0, 1)["code"], range(6)))
+    assert codes == ["SUCCESS"] * 6
+    assert server["hits"] == 6
+    assert server["peak"] == 2
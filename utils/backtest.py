@@ -0,0 +1,240 @@
+#%%
+"""
+Vectorized backtest of valuation-band mean reversion.
+
+The Company page draws P/E, P/B and P/S with mean +-1/2 sigma bands. This
+turns the bands into a rule and tests it on every ticker at once:
+
+- valuations and closes are aligned into date x ticker matrices;
+- each day's z-score uses the expanding mean/std of the history up to the
+  previous day, so there is no look-ahead (the chart's bands use the full
+  sample and would);
+- a long position opens when z <= `entry` and closes when z >= `exit`
+  (side='short' mirrors both), held from the next day's return on;
+- trades, hit rates, returns and drawdowns are aggregated per ticker and per
+  L2 sector, the latter as an equal-weight portfolio of the sector's tickers.
+
+Every step is a NumPy operation over the whole matrix; nothing loops over
+tickers or days in Python.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.price_analytics import TRADING_DAYS
+from utils.utils import get_data_path
+
+METRICS = ['P/E', 'P/B', 'P/S']
+
+
+#%% Matrices
+def valuation_matrix(val, metric, tickers=None):
+    """
+    Date x ticker matrix of one valuation metric. Non-positive multiples
+    (loss-making P/E, negative equity P/B) are treated as missing.
+    """
+    if tickers is not None:
+        val = val[val['TICKER'].isin(tickers)]
+    matrix = val.pivot_table(index='TRADE_DATE', columns='TICKER', values=metric, aggfunc='last')
+    matrix.index = pd.to_datetime(matrix.index)
+    matrix = matrix.sort_index().astype('float64')
+    return matrix.where(matrix > 0)
+
+def align(values, close):
+    """
+    Valuations carried forward onto the trading days of `close`, with the
+    tickers present in both.
+    """
+    tickers = values.columns.intersection(close.columns)
+    dates = values.index.union(close.index)
+    values = values[tickers].reindex(dates).ffill().reindex(close.index)
+    return values, close[tickers]
+
+def get_sector_map():
+    """
+    {ticker: L2 sector} from STOCK LIST.xlsx.
+    """
+    stock_list = pd.read_excel(get_data_path("STOCK LIST.xlsx")).dropna(subset=['Ticker', 'L2'])
+    return dict(zip(stock_list['Ticker'], stock_list['L2']))
+
+
+#%% Signals
+def _shift(x, periods=1, fill=np.nan):
+    out = np.full_like(x, fill)
+    out[periods:] = x[:-periods]
+    return out
+
+def _ffill(x):
+    """
+    Forward fill NaN down each column.
+    """
+    rows = np.where(np.isnan(x), 0, np.arange(x.shape[0])[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return x[rows, np.arange(x.shape[1])]
+
+def band_zscores(values, min_periods=250):
+    """
+    z-score of each value against the expanding mean/std of the column's
+    history up to the previous row. NaN until `min_periods` observations.
+    """
+    valid = ~np.isnan(values)
+    x = np.where(valid, values, 0.0)
+    n = np.cumsum(valid, axis=0, dtype='float64')
+    s1 = np.cumsum(x, axis=0)
+    s2 = np.cumsum(x * x, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = s1 / n
+        std = np.sqrt(np.maximum(s2 - s1 * mean, 0.0) / (n - 1))
+        mean, std, n = _shift(mean), _shift(std), _shift(n, fill=0.0)
+        z = (values - mean) / std
+    z[(n < min_periods) | ~(std > 0)] = np.nan
+    return z
+
+def band_positions(z, entry=-1.0, exit=0.0, side='long'):
+    """
+    Position (1/-1/0) at each close: a long opens at z <= entry and closes at
+    z >= exit; side='short' opens at z >= -entry and closes at z <= -exit.
+    Between events the previous state carries forward.
+    """
+    if entry >= exit:
+        raise ValueError("entry must be below exit")
+    sign = 1.0 if side == 'long' else -1.0
+    signed = sign * z
+    events = np.full_like(z, np.nan)
+    events[signed <= entry] = 1.0
+    events[signed >= exit] = 0.0
+    events[0] = np.where(np.isnan(events[0]), 0.0, events[0])
+    return sign * _ffill(events)
+
+
+#%% Backtest
+def backtest(values, close, entry=-1.0, exit=0.0, side='long', min_periods=250, cost_bps=0.0):
+    """
+    Run the band rule on aligned date x ticker frames (see `align`).
+    Returns (daily strategy returns, positions held, trades), the first two
+    as date x ticker frames and trades as one row per trade with TICKER,
+    ENTRY, EXIT (last day held), DAYS and RETURN. `cost_bps` is charged per
+    side, so a trade's RETURN compounds to the same growth as the equity
+    curve over its days.
+    """
+    x = values.to_numpy(dtype='float64')
+    c = close.to_numpy(dtype='float64')
+    z = band_zscores(x, min_periods)
+    z[~np.maximum.accumulate(~np.isnan(c), axis=0)] = np.nan  # no positions before the first price
+    # A position decided at the close of t earns the return of t+1
+    held = _shift(band_positions(z, entry, exit, side), fill=0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ret = c / _ffill(_shift(c)) - 1
+    ret = np.where(np.isfinite(ret), ret, 0.0)
+    # Each side's cost is charged inside the trade: the entry on its first
+    # day held, the exit on its last (open trades at the end pay no exit)
+    following = np.vstack([held[1:], held[-1:]])
+    entries = np.abs(held) * (held != _shift(held, fill=0.0))
+    exits = np.abs(held) * (held != following)
+    strat = held * ret - (entries + exits) * cost_bps / 1e4
+
+    # Trades: a run of consecutive non-zero held positions with the same sign
+    in_trade = held != 0
+    starts = in_trade & (held != _shift(held, fill=0.0))
+    trade_no = np.cumsum(starts, axis=0)
+    rows, cols = np.nonzero(in_trade)
+    keys = cols.astype('int64') * (int(trade_no.max()) + 1) + trade_no[rows, cols]
+    unique, inverse = np.unique(keys, return_inverse=True)
+    growth = np.bincount(inverse, weights=np.log1p(strat[rows, cols]), minlength=len(unique))
+    first = np.full(len(unique), rows.max() + 1 if len(rows) else 0)
+    np.minimum.at(first, inverse, rows)
+    last = np.zeros(len(unique), dtype='int64')
+    np.maximum.at(last, inverse, rows)
+    trade_cols = np.zeros(len(unique), dtype='int64')
+    trade_cols[inverse] = cols
+
+    dates = values.index
+    trades = pd.DataFrame({
+        'TICKER': values.columns[trade_cols],
+        'SIDE': np.where(held[first, trade_cols] > 0, 'long', 'short'),
+        'ENTRY': dates[first],
+        'EXIT': dates[last],
+        'DAYS': last - first + 1,
+        'RETURN': np.expm1(growth),
+    })
+    return (pd.DataFrame(strat, index=dates, columns=values.columns),
+            pd.DataFrame(held, index=dates, columns=values.columns), trades)
+
+
+#%% Reporting
+def _max_drawdown(returns):
+    equity = np.cumprod(1 + returns, axis=0)
+    peak = np.maximum.accumulate(np.maximum(equity, 1.0), axis=0)
+    return (equity / peak - 1).min(axis=0)
+
+def _cagr(total, days):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(days > 0, (1 + total) ** (TRADING_DAYS / days) - 1, np.nan)
+
+def ticker_summary(strat, held, trades, close, sectors):
+    """
+    One row per ticker: trades, hit rate, average trade, strategy and
+    buy-and-hold total return, CAGR, exposure and max drawdown.
+    """
+    r = strat.to_numpy()
+    live = close.notna().to_numpy()
+    days = live.sum(axis=0)
+    total = np.prod(1 + r, axis=0) - 1
+    closes = close.ffill().bfill()
+    grouped = trades.groupby('TICKER')['RETURN']
+    summary = pd.DataFrame({
+        'SECTOR': close.columns.map(sectors),
+        'TRADES': grouped.size().reindex(close.columns, fill_value=0).to_numpy(),
+        'HIT_RATE': (trades['RETURN'] > 0).groupby(trades['TICKER']).mean().reindex(close.columns).to_numpy(),
+        'AVG_TRADE': grouped.mean().reindex(close.columns).to_numpy(),
+        'RETURN': total,
+        'CAGR': _cagr(total, days),
+        'BUY_HOLD': (closes.iloc[-1] / closes.iloc[0] - 1).to_numpy(),
+        'EXPOSURE': (held.to_numpy() != 0).sum(axis=0) / np.maximum(days, 1),
+        'MAX_DD': _max_drawdown(r),
+    }, index=close.columns)
+    summary.index.name = 'TICKER'
+    return summary
+
+def sector_summary(strat, trades, close, summary):
+    """
+    Per L2 sector: an equal-weight daily portfolio of its tickers' strategy
+    returns (tickers count once they have a price), with pooled trade stats.
+    Returns (summary frame, date x sector equity curves).
+    """
+    live = close.notna().cummax()
+    curves, rows = {}, []
+    for sector, members in summary.groupby('SECTOR').groups.items():
+        weights = live[members].to_numpy(dtype='float64')
+        count = weights.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            daily = np.where(count > 0, (strat[members].to_numpy() * weights).sum(axis=1) / count, 0.0)
+        curves[sector] = np.cumprod(1 + daily)
+        sector_trades = trades.loc[trades['TICKER'].isin(members), 'RETURN']
+        total = curves[sector][-1] - 1
+        rows.append({
+            'SECTOR': sector,
+            'TICKERS': len(members),
+            'TRADES': len(sector_trades),
+            'HIT_RATE': (sector_trades > 0).mean() if len(sector_trades) else np.nan,
+            'AVG_TRADE': sector_trades.mean(),
+            'RETURN': total,
+            'CAGR': float(_cagr(total, int((count > 0).sum()))),
+            'MAX_DD': float(_max_drawdown(daily[:, None])[0]),
+            'MEDIAN_TICKER': summary.loc[members, 'RETURN'].median(),
+            'BUY_HOLD': summary.loc[members, 'BUY_HOLD'].median(),
+        })
+    sectors = pd.DataFrame(rows).set_index('SECTOR').sort_values('RETURN', ascending=False) if rows else pd.DataFrame()
+    return sectors, pd.DataFrame(curves, index=strat.index)
+
+def run_backtest(val, close, metric='P/E', entry=-1.0, exit=0.0, side='long', min_periods=250,
+                 cost_bps=0.0, sectors=None):
+    """
+    Band backtest of `metric` over every ticker in both `val` and `close`.
+    Returns a dict with 'tickers' and 'sectors' summaries, sector 'equity'
+    curves and the 'trades' list.
+    """
+    values, close = align(valuation_matrix(val, metric), close)
+    strat, held, trades = backtest(values, close, entry, exit, side, min_periods, cost_bps)
+    summary = ticker_summary(strat, held, trades, close, sectors if sectors is not None else get_sector_map())
+    sector_table, equity = sector_summary(strat, trades, close, summary)
+    return {'tickers': summary, 'sectors': sector_table, 'equity': equity, 'trades': trades}
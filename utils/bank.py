@@ -0,0 +1,398 @@
+#%%
+"""
+Bank statement engine shared by the bank pages: keycode mapping, numeric
+parsing, statements by frequency and the table/figure builders.
+
+The bank files store values in display formats: BS/IS/Nt items as "74,124.4"
+strings in bn VND, and in the *_formatted files CA ratios as percentages
+("110.03%" or 110.03) and CA amounts as bn strings. `to_numeric` turns any of
+them into plain numbers in df_q_full's units (items in bn VND, CA ratios as
+fractions, CA amounts in VND), so quarterly and annual data compare directly.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import plotly.colors
+import plotly.graph_objects as go
+
+from utils.cache import versioned_cache
+from utils.datasets import read_dataset
+from utils.fig_spec import subplot_grid, axis_refs, trace, figure
+from utils.utils import get_data_path
+
+KEY_COLUMNS = ['ORGANCODE', 'TICKER', 'YEARREPORT', 'LENGTHREPORT', 'PERIOD_INDEX', 'DATE']
+
+
+#%% Keycodes
+def load_keycode_mapping():
+    mapping = pd.read_excel(get_data_path("IRIS KeyCodes - Bank.xlsx"))
+    mapping = mapping[~(mapping['DWHCode'].isna())]
+    return mapping[['DWHCode', 'KeyCode', 'Name', 'Format']]
+
+def ca_formats(mapping):
+    """
+    {CA keycode: 'pct' | 'abs'}
+    """
+    ca = mapping[mapping['KeyCode'].astype(str).str.startswith('CA.')]
+    return dict(zip(ca['KeyCode'], ca['Format']))
+
+@lru_cache(maxsize=1)
+def _mapping():
+    return load_keycode_mapping()
+
+@lru_cache(maxsize=1)
+def keycode_names():
+    """
+    {keycode: display name}, without Dividend (not used in the dashboard).
+    """
+    names = _mapping().set_index('KeyCode')['Name'].to_dict()
+    names.pop("Dividend")
+    return names
+
+@lru_cache(maxsize=1)
+def ca_pct_codes():
+    return frozenset(k for k, fmt in ca_formats(_mapping()).items() if fmt == 'pct')
+
+def load_classification():
+    classification = pd.read_excel(get_data_path("Classification.xlsx"))
+    classification['GROUP'] = classification['GROUP'].astype(str)
+    return classification
+
+
+#%% Parsing
+def _parse(series):
+    # Anything not numeric (object, str or Arrow-backed strings from shared mode) goes through the parser
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype('float64')
+    text = series.astype(str).str.replace(',', '', regex=False).str.rstrip('%')
+    return pd.to_numeric(text, errors='coerce')
+
+def to_numeric(frame, ca_format, formatted=False):
+    """
+    Numeric copy of a bank statement frame in df_q_full's units.
+    formatted: the frame is one of the *_formatted files (CA pct x100, CA amounts in bn).
+    """
+    values = {}
+    for col in frame.columns:
+        if col in KEY_COLUMNS:
+            continue
+        parsed = _parse(frame[col])
+        if formatted and col in ca_format:
+            parsed = parsed / 100 if ca_format[col] == 'pct' else parsed * 1e9
+        values[col] = parsed.to_numpy(dtype='float64')
+    numeric = pd.DataFrame(values, index=frame.index)
+    keys = frame[[c for c in KEY_COLUMNS if c in frame.columns]]
+    return pd.concat([keys, numeric], axis=1)
+
+def period_label(frame):
+    """
+    DATE of each row: YYYYQn for quarters, YYYY for annual rows (LENGTHREPORT 5).
+    """
+    year = frame['YEARREPORT'].astype(int).astype(str)
+    return np.where(frame['LENGTHREPORT'].astype(int) == 5, year, year + 'Q' + frame['LENGTHREPORT'].astype(int).astype(str))
+
+
+#%% Statements by frequency
+FREQUENCIES = ['quarterly', 'annual']
+
+@versioned_cache(maxsize=4)
+def _quarterly_display(frame):
+    return frame.assign(DATE=period_label(frame))
+
+@versioned_cache(maxsize=4)
+def _annual_display(frame):
+    """
+    df_a_full_formatted in df_q_full_formatted's conventions: CA pct ratios as
+    numbers x100 (the file has "110.03%" strings), DATE = year.
+    """
+    frame = frame.assign(DATE=period_label(frame))
+    for col in ca_pct_codes():
+        if col in frame.columns and not pd.api.types.is_numeric_dtype(frame[col]):
+            frame[col] = _parse(frame[col])
+    return frame
+
+def load_statements(frequency='quarterly'):
+    """
+    Display-formatted bank statements of one frequency, with DATE. Only the
+    requested file is read, and each frequency is cached on its own version,
+    so sessions that stay on quarterly never load the annual data.
+    """
+    if frequency == 'annual':
+        return _annual_display(read_dataset("df_a_full_formatted.csv"))
+    return _quarterly_display(read_dataset("df_q_full_formatted.csv"))
+
+
+#%% Functions for single bank data table
+@versioned_cache()
+def single_ticker(df, ticker):
+    """
+    Extract data for a single ticker
+    """
+    df_ticker = df[df['TICKER'] == ticker].copy()
+    return df_ticker
+
+@versioned_cache()
+def single_income_statement(df, startperiod=2022):
+    """
+    IS.3 - Net Interest Income
+    IS.1 - Interest Income
+    IS.2 - Interest Expense
+    IS.6 - Net Fees Income
+    IS.14 - Total Operating Income
+    IS.15 - G&A Expense
+    IS.16 - PPOP
+    IS.17 - Provisions for credit losses
+    IS.18 - PBT
+    IS.24 - NPATMI
+    """
+    cols = ['DATE', 'IS.3', 'IS.1', 'IS.2', 'IS.6', 'IS.14', 'IS.15', 'IS.16', 'IS.17', 'IS.18', 'IS.24']
+    df_is = df[df['YEARREPORT'] >= startperiod][cols].copy()
+
+    df_melted = df_is.melt(id_vars='DATE', var_name='Metric', value_name='Value')
+    df_pivoted = df_melted.pivot(index='Metric', columns='DATE', values='Value')
+    df_pivoted = df_pivoted.reindex(index=cols[1:])
+    df_pivoted = df_pivoted.rename(index=keycode_names())
+    return df_pivoted
+
+@versioned_cache()
+def single_size(df, startperiod = 2022):
+    """
+    BS.1 - Total Assets
+    CA.16 - Total Credit
+    BS.13 - Total Loans
+    Nt.97 - Total Government Bonds
+    BS.56 - Total Deposits
+    BS.65 - Total Equity
+    """
+    cols = ['DATE', 'BS.1','CA.16','BS.13','Nt.97','BS.56','BS.65']
+    df_size = df[df['YEARREPORT'] >= startperiod][cols].copy()
+
+    df_melted = df_size.melt(id_vars='DATE', var_name='Metric', value_name='Value')
+    df_pivoted = df_melted.pivot(index='Metric', columns='DATE', values='Value')
+    df_pivoted = df_pivoted.reindex(index=cols[1:])
+    df_pivoted = df_pivoted.rename(index=keycode_names())    
+    return df_pivoted
+
+@versioned_cache()
+def single_earnings_quality(df, startperiod = 2022):
+    """
+    CA.25 - Average Asset Yield
+    CA.35 - Average Loan Yield
+    CA.38 - Average Bond Yield
+    CA.41 - Average Deposit Yield
+    CA.26 - Average Funding Cost
+    CA.44 - Cost of Funding from Deposit
+    CA.47 - Cost of Funding from Loan
+    CA.49 - Cost of Funding from Valuable Paper
+    CA.27 - NIM
+    CA.28 - Provision to PPOP
+    CA.14 - CIR    
+    """
+    cols = ['DATE', 'CA.25', 'CA.35', 'CA.38', 'CA.41', 'CA.26', 'CA.44', 'CA.47', 'CA.49', 'CA.27', 'CA.28', 'CA.14']
+    df_eq = df[df['YEARREPORT'] >= startperiod][cols].copy()
+
+    df_melted = df_eq.melt(id_vars='DATE', var_name='Metric', value_name='Value')
+    df_pivoted = df_melted.pivot(index='Metric', columns='DATE', values='Value')
+    df_pivoted = df_pivoted.reindex(index=cols[1:])
+    df_pivoted = df_pivoted.rename(index=keycode_names())
+    return df_pivoted
+
+@versioned_cache()
+def single_asset_quality(df, startperiod = 2022):
+    """
+    CA.5 - NPL %
+    CA.13 - NPL Formation %
+    CA.6 - Group 5 %
+    CA.10 - G2 Formation %
+    CA.15 - LLR
+    """
+    cols = ['DATE', 'CA.5', 'CA.13', 'CA.6', 'CA.10', 'CA.15']
+    df_asset_quality = df[df['YEARREPORT'] >= startperiod][cols].copy()
+
+    df_melted = df_asset_quality.melt(id_vars='DATE', var_name='Metric', value_name='Value')
+    df_pivoted = df_melted.pivot(index='Metric', columns='DATE', values='Value')
+    df_pivoted = df_pivoted.reindex(index=cols[1:])
+    df_pivoted = df_pivoted.rename(index=keycode_names())
+    
+    return df_pivoted
+
+@versioned_cache()
+def plot(df):
+    df_temp = df.copy()
+    row = df_temp.shape[0] // 2 + 1
+    layout = subplot_grid(row, 2, df_temp.index.tolist(), vertical_spacing=0.05)
+
+    data = []
+    for i, metric in enumerate(df_temp.index):
+        row = i // 2 + 1
+        col = i % 2 + 1
+        data.append(trace('bar', row, col, 2, x=df_temp.columns, y=df_temp.loc[metric], name=metric))
+
+    layout.update(
+        height=400 * row, width=1200, 
+        title=dict(text="Asset Quality Metrics"), 
+        showlegend=False,
+        # template='simple_white',
+    )
+    return figure(data, layout)
+
+#%% Functions for multiple banks data table
+@versioned_cache()
+def income_statement_multi(df, tickers, period = '2025Q1'):
+    """
+    IS.3 - Net Interest Income
+    IS.1 - Interest Income
+    IS.2 - Interest Expense
+    IS.6 - Net Fees Income
+    IS.14 - Total Operating Income
+    IS.15 - G&A Expense
+    IS.16 - PPOP
+    IS.17 - Provisions for credit losses
+    IS.18 - PBT
+    IS.24 - NPATMI
+    """
+    cols = ['TICKER', 'IS.3', 'IS.1', 'IS.2', 'IS.6', 'IS.14', 'IS.15', 'IS.16', 'IS.17', 'IS.18', 'IS.24']
+    df_is = df[(df['DATE'] == period) & (df['TICKER'].isin(tickers))][cols].copy()
+
+    df_melted = df_is.melt(id_vars='TICKER', var_name='Metric', value_name='Value')
+    df_pivoted = df_melted.pivot_table(index='Metric', columns='TICKER', values='Value', aggfunc='first')
+    df_pivoted = df_pivoted.reindex(index=cols[1:])
+    df_pivoted = df_pivoted.rename(index=keycode_names())
+    
+    return df_pivoted
+
+@versioned_cache()
+def size_multi(df, tickers, period = '2025Q1'):
+    """
+    BS.1 - Total Assets
+    CA.16 - Total Credit
+    BS.13 - Total Loans
+    Nt.97 - Total Government Bonds
+    BS.56 - Total Deposits
+    BS.65 - Total Equity
+    """
+    cols = ['TICKER','BS.1','CA.16','BS.13','Nt.97','BS.56','BS.65']
+    df_size = df[(df['DATE'] == period) & (df['TICKER'].isin(tickers))][cols].copy()
+
+    df_melted = df_size.melt(id_vars='TICKER', var_name='Metric', value_name='Value')
+    df_pivoted = df_melted.pivot(index='Metric', columns='TICKER', values='Value')
+    df_pivoted = df_pivoted.reindex(index=cols[1:])
+    df_pivoted = df_pivoted.rename(index=keycode_names())
+    return df_pivoted
+
+@versioned_cache()
+def earnings_quality_multi(df, tickers , period = '2025Q1'):
+    """
+    CA.25 - Average Asset Yield
+    CA.35 - Average Loan Yield
+    CA.38 - Average Bond Yield
+    CA.41 - Average Deposit Yield
+    CA.26 - Average Funding Cost
+    CA.44 - Cost of Funding from Deposit
+    CA.47 - Cost of Funding from Loan
+    CA.49 - Cost of Funding from Valuable Paper
+    CA.27 - NIM
+    CA.28 - Provision to PPOP
+    CA.14 - CIR    
+    """
+    cols = ['TICKER', 'CA.25', 'CA.35', 'CA.38', 'CA.41', 'CA.26', 'CA.44', 'CA.47', 'CA.49', 'CA.27', 'CA.28', 'CA.14']
+    df_eq = df[(df['DATE'] == period) & (df['TICKER'].isin(tickers))][cols].copy()
+        
+    df_melted = df_eq.melt(id_vars='TICKER', var_name='Metric', value_name='Value')
+    df_pivoted = df_melted.pivot(index='Metric', columns='TICKER', values='Value')
+    df_pivoted = df_pivoted.reindex(index=cols[1:])
+    df_pivoted = df_pivoted.rename(index=keycode_names())
+    
+    return df_pivoted 
+
+@versioned_cache()
+def asset_quality_multi(df, tickers, period = '2025Q1'):
+    """
+    CA.5 - NPL %
+    CA.13 - NPL Formation %
+    CA.6 - Group 5 %
+    CA.10 - G2 Formation %
+    CA.15 - LLR
+    """
+    cols = ['TICKER', 'CA.5', 'CA.13', 'CA.6', 'CA.10', 'CA.15']
+    df_asset_quality = df[(df['DATE'] == period) & (df['TICKER'].isin(tickers))][cols].copy()
+
+    df_melted = df_asset_quality.melt(id_vars='TICKER', var_name='Metric', value_name='Value')
+    df_pivoted = df_melted.pivot(index='Metric', columns='TICKER', values='Value')
+    df_pivoted = df_pivoted.reindex(index=cols[1:])
+    df_pivoted = df_pivoted.rename(index=keycode_names())
+
+    return df_pivoted
+
+#%% Free plotting function
+@versioned_cache()
+def visualize_multi_ticker_data(df, tickers, keycodes, startperiod=2021):
+    """
+    Visualize data for multiple tickers over time on the same chart.
+    keycodes: list of keycodes to plot, each in its own subplot.
+    If one keycode, use 1 column; else use 2 columns per row.
+    """
+    if not keycodes or not tickers:
+        return go.Figure()  # Return empty figure if nothing selected
+
+    if isinstance(keycodes, str):
+        keycodes = [keycodes]
+    ca_pct = ca_pct_codes()
+    n = len(keycodes)
+    ncols = 1 if n == 1 else 2
+    nrows = (n + ncols - 1) // ncols
+
+    # Assign a color to each ticker
+    palette = plotly.colors.qualitative.Plotly
+    ticker_colors = {ticker: palette[i % len(palette)] for i, ticker in enumerate(tickers)}
+
+    layout = subplot_grid(
+        nrows, ncols, shared_xaxes=True,
+        subplot_titles=[keycode_names().get(k, k) for k in keycodes],
+        vertical_spacing=0.07
+    )
+    data = []
+    for idx, keycode in enumerate(keycodes):
+        row = idx // ncols + 1
+        col = idx % ncols + 1
+        for t_idx, ticker in enumerate(tickers):
+            df_ticker = df[(df['TICKER'] == ticker) & (df['YEARREPORT'] >= startperiod)].copy()
+            df_ticker = df_ticker.sort_values(['YEARREPORT', 'LENGTHREPORT'])
+            if keycode in ca_pct:
+                df_ticker[keycode] = df_ticker[keycode] * 100
+            if keycode in df_ticker.columns and not df_ticker.empty:
+                # Only show legend for first subplot
+                showlegend = (idx == 0)
+                data.append(
+                    trace(
+                        'scatter', row, col, ncols,
+                        x=df_ticker['DATE'],
+                        y=pd.to_numeric(df_ticker[keycode], errors='coerce'),
+                        name=ticker,
+                        mode='lines+markers',
+                        marker=dict(color=ticker_colors[ticker]),
+                        line=dict(color=ticker_colors[ticker]),
+                        showlegend=showlegend,
+                    )
+                )
+    layout.update(
+        title=dict(text="Multi Ticker Data"),
+        width=1200,
+        height=500 * nrows,
+        template="plotly_white",
+        barmode='group',
+        showlegend=True
+    )
+    layout['xaxis']['showgrid'] = False
+    # Set y-axis titles for each subplot
+    for idx, keycode in enumerate(keycodes):
+        row = idx // ncols + 1
+        col = idx % ncols + 1
+        yaxis = layout['yaxis' + axis_refs(row, col, ncols)[1][1:]]
+        yaxis['title'] = dict(text=keycode_names().get(keycode, keycode))
+        if keycode in ca_pct:
+            yaxis.update(ticksuffix="%", tickformat=".2f")
+        else:
+            yaxis.update(tickformat="~s")
+    return figure(data, layout)
@@ -0,0 +1,111 @@
+#%%
+"""
+Cross-bank ranking of every keycode, per period.
+
+For each (period, keycode) every classified bank gets its rank and percentile
+within the industry and within its Classification.xlsx group, from one
+groupby-rank over the long table. Rank 1 is the highest value; percentile is
+the share of peers with a value at or below the bank's (1.0 = highest), so
+whether high is good depends on the metric (NIM vs NPL). Group rows
+(INDUSTRY, SOCB, 1, 2, 3) are not ranked.
+"""
+import numpy as np
+import pandas as pd
+
+from utils import bank
+from utils.cache import versioned_cache
+from utils.datasets import read_dataset
+from utils.fig_spec import trace, figure
+from utils.ingest import GROUP_TICKERS
+
+SCOPES = ['INDUSTRY', 'GROUP']
+
+
+#%% Ranking
+def build_rank_table(numeric, groups):
+    """
+    numeric: bank statements in numeric form (utils.bank.to_numeric) with DATE.
+    groups: {ticker: group}; banks outside it are not ranked.
+    Returns one row per (TICKER, DATE, KEYCODE) with VALUE, GROUP and
+    <scope>_RANK / <scope>_PCT / <scope>_N for each scope, in compact dtypes.
+    """
+    keycodes = [k for k in bank.keycode_names() if k in numeric.columns]
+    banks = numeric[numeric['TICKER'].isin(groups) & ~numeric['TICKER'].isin(GROUP_TICKERS)]
+    long = banks.melt(id_vars=['TICKER', 'DATE'], value_vars=keycodes, var_name='KEYCODE', value_name='VALUE')
+    long = long[np.isfinite(long['VALUE'].to_numpy(dtype='float64'))]
+    long['GROUP'] = long['TICKER'].map(groups)
+
+    table = {
+        'TICKER': long['TICKER'].astype('category'),
+        'DATE': long['DATE'].astype('category'),
+        'KEYCODE': long['KEYCODE'].astype('category'),
+        'GROUP': long['GROUP'].astype('category'),
+        'VALUE': long['VALUE'].astype('float32'),
+    }
+    for scope, by in [('INDUSTRY', ['DATE', 'KEYCODE']), ('GROUP', ['DATE', 'KEYCODE', 'GROUP'])]:
+        values = long.groupby(by, sort=False, observed=True)['VALUE']
+        table[f'{scope}_RANK'] = values.rank(ascending=False, method='min').astype('int16')
+        table[f'{scope}_PCT'] = values.rank(pct=True, method='max').astype('float32')
+        table[f'{scope}_N'] = values.transform('size').astype('int16')
+    return pd.DataFrame(table).reset_index(drop=True)
+
+@versioned_cache(maxsize=4)
+def _rank_table(numeric, groups):
+    return build_rank_table(numeric, dict(groups))
+
+@versioned_cache(maxsize=4)
+def _numeric_statements(frame, formatted):
+    numeric = bank.to_numeric(frame, bank.ca_formats(bank.load_keycode_mapping()), formatted=formatted)
+    numeric['DATE'] = bank.period_label(numeric)
+    return numeric
+
+def load_rank_table(frequency='quarterly', classification=None):
+    """
+    Rank table of one frequency, rebuilt only when the dataset changes.
+    """
+    if classification is None:
+        classification = bank.load_classification()
+    groups = tuple(sorted(zip(classification['TICKER'], classification['GROUP'])))
+    if frequency == 'annual':
+        numeric = _numeric_statements(read_dataset("df_a_full_formatted.csv"), True)
+    else:
+        numeric = _numeric_statements(read_dataset("df_q_full.csv"), False)
+    return _rank_table(numeric, groups)
+
+
+#%% Views
+def bank_position(ranks, ticker, scope='INDUSTRY', keycodes=None, start_year=None):
+    """
+    Percentile and rank matrices (keycode x period) of one bank.
+    Returns (percentile, rank, peers) DataFrames with keycodes in `keycodes` order.
+    """
+    rows = ranks[ranks['TICKER'] == ticker]
+    if keycodes is not None:
+        rows = rows[rows['KEYCODE'].isin(keycodes)]
+    if start_year is not None:
+        rows = rows[rows['DATE'].astype(str).str[:4].astype(int) >= start_year]
+
+    def matrix(column):
+        wide = rows.pivot_table(index='KEYCODE', columns='DATE', values=column, observed=True, aggfunc='first')
+        wide = wide.reindex(columns=sorted(wide.columns))
+        return wide.reindex([k for k in (keycodes or wide.index) if k in wide.index])
+    return matrix(f'{scope}_PCT'), matrix(f'{scope}_RANK'), matrix(f'{scope}_N')
+
+def position_heatmap(percentile, rank, peers, title=""):
+    """
+    Heatmap of a bank's percentiles with "rank/peers" in each cell.
+    """
+    names = bank.keycode_names()
+    labels = [f"{names.get(k, k)} ({k})" for k in percentile.index]
+    text = np.where(rank.notna(), rank.fillna(0).astype(int).astype(str) + '/' + peers.fillna(0).astype(int).astype(str), '')
+    data = [trace(
+        'heatmap', z=(percentile.to_numpy() * 100).round(1), x=[str(c) for c in percentile.columns], y=labels,
+        text=text, texttemplate="%{text}", zmin=0, zmax=100, colorscale='RdYlGn',
+        colorbar=dict(title=dict(text="Percentile")),
+        hovertemplate="%{y}<br>%{x}: rank %{text}, percentile %{z:.0f}<extra></extra>",
+    )]
+    layout = dict(
+        title=dict(text=title), height=max(400, 22 * len(labels) + 150),
+        yaxis=dict(autorange='reversed'), xaxis=dict(type='category'),
+    )
+    return figure(data if len(labels) else [], layout)
@@ -0,0 +1,216 @@
+#%%
+"""
+Build pipeline for the derived datasets in /data.
+
+    python -m utils.build [--force] [--workers N] [TARGET ...]
+
+Each step declares its input files, output files and a transform. Steps form
+a DAG through their files and run level by level: the steps of one level run
+concurrently, and their heavy work (whole transforms or per-ticker
+partitions) goes to a shared process pool. A step is skipped when the content
+hashes of its inputs and the source of the modules its transform runs (this
+module plus the step's `modules`) match the last successful run (kept in
+data/.build_state.json) and its outputs exist.
+
+Steps whose outputs do not yet reproduce the checked-in files write to
+data/build/ and only run when named as a target, so a default build never
+rewrites source data.
+
+The raw extracts (FA_processed, Val_processed, MktCap_processed,
+BankSupp_processed, df_q_full, df_a_full_formatted) come from upstream
+systems that are not part of this repo; the steps here start from them.
+"""
+import argparse
+import hashlib
+import importlib
+import inspect
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.datasets import DATASETS, write_shared
+from utils.utils import get_data_path, get_project_root, get_shared_data_path, get_temp_path
+
+# modules: extra modules whose code the transform depends on; default: built by a plain `build`
+Step = namedtuple('Step', ['name', 'inputs', 'outputs', 'run', 'modules', 'default'], defaults=((), True))
+
+STATE_FILE = "data/.build_state.json"
+
+
+#%% Transforms
+def map_partitions(pool, fn, frame, by, *args):
+    """
+    Apply fn(part, *args) to each `by` group of `frame` on the pool and
+    reassemble the parts in the original row order.
+    """
+    futures = [pool.submit(fn, part, *args) for _, part in frame.groupby(by, sort=False)]
+    return pd.concat([f.result() for f in futures]).sort_index()
+
+def format_bank_quarter(part, ca_format):
+    """
+    Display formatting of the CA (ratio) columns of df_q_full: pct ratios as
+    x100 with 2 decimals, amounts in bn VND as "1,234.5" strings. BS/IS/Nt
+    items are already formatted upstream.
+    """
+    part = part.copy()
+    for col, fmt in ca_format.items():
+        if col not in part.columns:
+            continue
+        values = part[col].to_numpy(dtype='float64')
+        if fmt == 'pct':
+            part[col] = np.round(values * 100, 2)
+        else:
+            part[col] = [f"{v / 1e9:,.1f}" if np.isfinite(v) else (np.nan if np.isnan(v) else v) for v in values]
+    return part
+
+def build_bank_formatted(inputs, outputs, pool):
+    bank_path, mapping_path = inputs
+    mapping = pd.read_excel(mapping_path)
+    mapping = mapping[mapping['KeyCode'].astype(str).str.startswith('CA.')]
+    ca_format = dict(zip(mapping['KeyCode'], mapping['Format']))
+    bank = pd.read_csv(bank_path)
+    formatted = map_partitions(pool, format_bank_quarter, bank, 'TICKER', ca_format)
+    _write_csv(formatted, outputs[0])
+
+def build_shared(inputs, outputs, pool):
+    pool.submit(write_shared, inputs[0], outputs[0]).result()
+
+def build_commodities(inputs, outputs, pool):
+    from utils.commodities import ingest
+    ingest(inputs)
+
+def _write_csv(frame, path):
+    tmp_path = get_temp_path(path)
+    try:
+        frame.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+#%% Steps
+def _data(filename):
+    return get_data_path(filename)
+
+def _build_output(filename):
+    return get_project_root() / "data" / "build" / filename
+
+STEPS = [
+    # Opt-in: CA.9/10/12/13 and Nt.220 in the checked-in file come from an older
+    # upstream vintage, so the rebuilt file differs and goes to data/build/
+    Step('df_q_full_formatted', [_data("df_q_full.csv"), _data("IRIS KeyCodes - Bank.xlsx")],
+         [_build_output("df_q_full_formatted.csv")], build_bank_formatted, default=False),
+] + [
+    Step(f"shared:{filename}", [_data(filename)], [get_shared_data_path(filename)], build_shared,
+         modules=('utils.datasets',))
+    for filename in DATASETS
+]
+# Ingesting here keeps the re-parse of updated sheets off the Commodities page load
+_commodity_sheets = sorted(p for p in (get_project_root() / "data" / "commodities").glob("*.xlsx")
+                           if not p.name.startswith("~$"))
+if _commodity_sheets:
+    STEPS.append(Step('commodities', _commodity_sheets, [get_project_root() / "data" / "commodities" / "series.arrow"],
+                      build_commodities, modules=('utils.commodities',)))
+
+
+#%% Runner
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _step_hash(step):
+    modules = [inspect.getmodule(step.run)] + [importlib.import_module(name) for name in step.modules]
+    digest = hashlib.sha256()
+    for module in modules:
+        digest.update(inspect.getsource(module).encode())
+    for path in step.inputs:
+        digest.update(_file_hash(path).encode())
+    return digest.hexdigest()
+
+def _levels(steps):
+    """
+    Group steps into levels: every step depends only on steps of earlier levels.
+    """
+    producer = {path: step.name for step in steps for path in step.outputs}
+    deps = {step.name: {producer[p] for p in step.inputs if p in producer} for step in steps}
+    levels, done = [], set()
+    while len(done) < len(steps):
+        level = [step for step in steps if step.name not in done and deps[step.name] <= done]
+        if not level:
+            raise ValueError(f"cycle between steps: {sorted(set(deps) - done)}")
+        levels.append(level)
+        done |= {step.name for step in level}
+    return levels
+
+def _select(targets):
+    """
+    The requested steps plus everything upstream of them (default: every
+    default step).
+    """
+    if not targets:
+        return [s for s in STEPS if s.default]
+    by_output = {path: step for step in STEPS for path in step.outputs}
+    selected, stack = {}, [s for s in STEPS if s.name in targets]
+    if len(stack) != len(set(targets)):
+        raise SystemExit(f"unknown target(s): {sorted(set(targets) - {s.name for s in STEPS})}")
+    while stack:
+        step = stack.pop()
+        if step.name not in selected:
+            selected[step.name] = step
+            stack += [by_output[p] for p in step.inputs if p in by_output]
+    return [s for s in STEPS if s.name in selected]
+
+def build(targets=(), force=False, workers=None):
+    """
+    Run the selected steps. Returns {step name: 'built' | 'skipped' | 'missing input'}.
+    """
+    state_path = get_project_root() / STATE_FILE
+    state = json.loads(state_path.read_text()) if state_path.exists() else {}
+    results = {}
+
+    def run(step, pool):
+        if any(results.get(dep) == 'missing input' for dep in step.inputs):
+            return 'missing input'
+        missing = [p for p in step.inputs if not p.exists()]
+        if missing:
+            print(f"{step.name}: skip, {', '.join(p.name for p in missing)} not found")
+            return 'missing input'
+        key = _step_hash(step)
+        if not force and state.get(step.name) == key and all(p.exists() for p in step.outputs):
+            return 'skipped'
+        for path in step.outputs:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        step.run(step.inputs, step.outputs, pool)
+        state[step.name] = key
+        print(f"{step.name}: built")
+        return 'built'
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for level in _levels(_select(targets)):
+            with ThreadPoolExecutor(max_workers=len(level)) as runner:
+                futures = {step.name: runner.submit(run, step, pool) for step in level}
+                for name, future in futures.items():
+                    results[name] = future.result()
+            # Outputs of a step that could not run count as missing downstream
+            for step in level:
+                if results[step.name] == 'missing input':
+                    results.update({path: 'missing input' for path in step.outputs})
+            state_path.write_text(json.dumps(state, indent=1, sort_keys=True))
+    return {step.name: results[step.name] for step in STEPS if step.name in results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the derived datasets in /data.")
+    parser.add_argument("targets", nargs="*", help=f"steps to build (default: all but opt-in steps): {', '.join(s.name for s in STEPS)}")
+    parser.add_argument("--force", action="store_true", help="rebuild even if inputs are unchanged")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    args = parser.parse_args()
+    for name, status in build(args.targets, args.force, args.workers).items():
+        print(f"{status:>14}  {name}")
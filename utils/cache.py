@@ -0,0 +1,136 @@
+#%%
+"""
+Memoization for the dashboard's builder functions keyed on dataset versions.
+
+`st.cache_data` hashes every DataFrame argument on each call, which for the
+multi-MB bank and FA frames costs about as much as the builders themselves.
+Here a frame is identified by a cheap version token instead:
+
+- `read_dataset` tags the frames it returns with (file, mtime).
+- Filtered/derived frames get a token from `derive(new, parent, *params)`,
+  e.g. derive(df[df['YEAR'] >= y], df, 'YEAR>=', y).
+- Results of a `versioned_cache` function are tagged with their call key,
+  so builders can be chained (plot(single_size(...))) and still hit.
+
+Tokens are attached to the exact frame object (not copied by pandas
+operations), so an untagged frame is never confused with its parent; calls
+with one are simply not cached. Cached results are shared between sessions
+and must be treated as read-only.
+"""
+import functools
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+_frames = weakref.WeakValueDictionary()  # id -> frame, to detect reused ids
+_tokens = {}  # id -> version token
+_token_lock = threading.Lock()
+_registry = {}  # qualified name -> cache, for cache_stats()
+
+
+#%% Version tokens
+def set_version(frame, token):
+    """
+    Tag `frame` with a version token and return it.
+    """
+    key = id(frame)
+    with _token_lock:
+        _frames[key] = frame
+        _tokens[key] = token
+    weakref.finalize(frame, _forget, key)
+    return frame
+
+def _forget(key):
+    with _token_lock:
+        if key not in _frames:
+            _tokens.pop(key, None)
+
+def get_version(frame):
+    """
+    Version token of `frame`, or None when it was never tagged.
+    """
+    with _token_lock:
+        if _frames.get(id(frame)) is frame:
+            return _tokens.get(id(frame))
+    return None
+
+def derive(frame, parent, *params):
+    """
+    Tag a frame computed from `parent` by a deterministic step described by `params`.
+    """
+    token = get_version(parent)
+    return set_version(frame, (token, params)) if token is not None else frame
+
+
+#%% Cache
+def _key_part(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        token = get_version(value)
+        if token is None:
+            raise TypeError("untagged frame")
+        return ('frame', token)
+    if isinstance(value, (list, tuple, np.ndarray, pd.Index)):
+        return tuple(_key_part(v) for v in value)
+    hash(value)
+    return value
+
+def versioned_cache(maxsize=128):
+    """
+    LRU-memoize a builder whose DataFrame arguments carry version tokens.
+    Other arguments (tickers, periods, keycode lists...) become part of the
+    key; lists and arrays are keyed by value.
+    """
+    def decorator(fn):
+        entries = OrderedDict()
+        lock = threading.Lock()
+        stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'uncached': 0, 'maxsize': maxsize}
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                key = (fn.__qualname__, _key_part(args), _key_part(tuple(sorted(kwargs.items()))))
+            except TypeError:
+                with lock:
+                    stats['uncached'] += 1
+                return fn(*args, **kwargs)
+
+            with lock:
+                if key in entries:
+                    entries.move_to_end(key)
+                    stats['hits'] += 1
+                    return entries[key]
+                stats['misses'] += 1
+
+            result = fn(*args, **kwargs)
+            if isinstance(result, (pd.DataFrame, pd.Series)):
+                set_version(result, key)
+            with lock:
+                entries[key] = result
+                entries.move_to_end(key)
+                while len(entries) > maxsize:
+                    entries.popitem(last=False)
+                    stats['evictions'] += 1
+            return result
+
+        def cache_info():
+            with lock:
+                return dict(stats, size=len(entries))
+
+        def cache_clear():
+            with lock:
+                entries.clear()
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        _registry[f"{fn.__module__}.{fn.__qualname__}"] = wrapper
+        return wrapper
+    return decorator
+
+def cache_stats():
+    """
+    Hit/miss/eviction counts and size of every versioned cache in the process.
+    """
+    return {name: fn.cache_info() for name, fn in _registry.items()}
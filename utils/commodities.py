@@ -0,0 +1,183 @@
+#%%
+"""
+Commodity price series store.
+
+Source sheets (one or more series each) live in data/commodities/*.xlsx and
+are ingested into one long, date-sorted Arrow file (SERIES, DATE, VALUE):
+
+    python -m utils.commodities ingest [PATH ...]
+
+Ingest is incremental: rows already stored with the same value are left
+alone, new dates are appended, and revised values overwrite the stored ones.
+`load_store` re-ingests automatically when a source sheet is newer than the
+store, so dropping a new sheet into data/commodities is enough. Run the CLI
+after updating a sheet to keep that re-parse off the first page load.
+
+Moving averages are computed on each series' full history and only then
+sliced to the requested window, so the first points shown have a full MA.
+"""
+import os
+import sys
+import threading
+
+import pandas as pd
+
+from utils.cache import set_version
+from utils.indicators import sma
+from utils.utils import get_project_root, get_temp_path
+
+# Bloomberg codes of known series -> (display name, unit)
+SERIES_INFO = {
+    'CDSPHRAV Index': ('China HRC', 'Yuan/MT'),
+}
+FREQUENCIES = {'Daily': None, 'Weekly': 'W-FRI'}
+
+_store = None  # (mtime_ns, frame)
+_lock = threading.Lock()
+_ingest_lock = threading.Lock()
+
+
+#%% Layout
+def get_commodity_dir():
+    return get_project_root() / "data" / "commodities"
+
+def get_store_path():
+    return get_commodity_dir() / "series.arrow"
+
+def series_label(code):
+    name, unit = SERIES_INFO.get(code, (code, ""))
+    return f"{name} ({unit})" if unit else name
+
+
+#%% Sheets
+def read_sheet(path, sheet_name=0):
+    """
+    Long (SERIES, DATE, VALUE) rows of one sheet. Two layouts are accepted:
+    - Bloomberg export: a field row (e.g. ClosePrice), then a row with 'Date'
+      and the security codes, then the data;
+    - plain: a 'Date' header and one column per series.
+    """
+    raw = pd.read_excel(path, sheet_name=sheet_name, header=None)
+    header_row = raw.index[raw.iloc[:, 0].astype(str).str.strip().str.lower() == 'date']
+    if len(header_row) == 0:
+        raise ValueError(f"{path}: no 'Date' header row")
+    header = header_row[0]
+    data = raw.iloc[header + 1:].copy()
+    data.columns = ['DATE'] + [str(c).strip() for c in raw.iloc[header, 1:]]
+    data['DATE'] = pd.to_datetime(data['DATE'], errors='coerce')
+    long = data.dropna(subset=['DATE']).melt(id_vars='DATE', var_name='SERIES', value_name='VALUE')
+    long['VALUE'] = pd.to_numeric(long['VALUE'], errors='coerce')
+    return long.dropna(subset=['VALUE'])[['SERIES', 'DATE', 'VALUE']]
+
+def _source_paths():
+    return sorted(p for p in get_commodity_dir().glob("*.xlsx") if not p.name.startswith("~$"))
+
+
+#%% Store
+def _read_store_file():
+    import pyarrow as pa
+
+    path = get_store_path()
+    if not path.exists():
+        return pd.DataFrame({'SERIES': pd.Series(dtype=str), 'DATE': pd.Series(dtype='datetime64[ns]'),
+                             'VALUE': pd.Series(dtype='float64')})
+    with pa.memory_map(str(path), "r") as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+def _write_store_file(frame):
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    path = get_store_path()
+    tmp_path = get_temp_path(path)
+    try:
+        with pa.OSFile(str(tmp_path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+def ingest(paths=None):
+    """
+    Upsert the rows of the given sheets (default: every sheet in
+    data/commodities) into the store. Returns {series: rows added or revised}.
+    """
+    incoming = pd.concat([read_sheet(p) for p in (paths or _source_paths())], ignore_index=True)
+    incoming = incoming.drop_duplicates(['SERIES', 'DATE'], keep='last')
+    stored = _read_store_file()
+
+    merged = stored.merge(incoming, on=['SERIES', 'DATE'], how='outer', suffixes=('', '_NEW'), indicator=True)
+    changed = (merged['_merge'] == 'right_only') | (
+        (merged['_merge'] == 'both') & (merged['VALUE'] != merged['VALUE_NEW']))
+    counts = merged.loc[changed, 'SERIES'].value_counts().to_dict()
+    if counts or not get_store_path().exists():
+        merged['VALUE'] = merged['VALUE_NEW'].where(merged['VALUE_NEW'].notna(), merged['VALUE'])
+        store = merged[['SERIES', 'DATE', 'VALUE']].sort_values(['SERIES', 'DATE'], ignore_index=True)
+        get_commodity_dir().mkdir(parents=True, exist_ok=True)
+        _write_store_file(store)
+    else:
+        # Mark the store as current so load_store does not re-parse unchanged sheets
+        os.utime(get_store_path())
+    return counts
+
+def _store_outdated(sources):
+    path = get_store_path()
+    return bool(sources) and (not path.exists() or
+                              max(p.stat().st_mtime_ns for p in sources) > path.stat().st_mtime_ns)
+
+def load_store():
+    """
+    The full store, re-ingesting first if a source sheet changed. Only one
+    thread ingests; the others wait for it and then read its result. Parsed
+    once per store version and tagged for utils.cache.
+    """
+    global _store
+    path = get_store_path()
+    sources = _source_paths()
+    if _store_outdated(sources):
+        with _ingest_lock:
+            if _store_outdated(sources):
+                ingest(sources)
+    mtime = path.stat().st_mtime_ns if path.exists() else None
+    with _lock:
+        if _store is None or _store[0] != mtime:
+            frame = _read_store_file()
+            frame['SERIES'] = frame['SERIES'].astype('category')
+            _store = (mtime, set_version(frame, ('commodities', mtime)))
+        return _store[1]
+
+
+#%% Views
+def series_view(store, series, frequency='Daily', windows=(5, 20), start=None):
+    """
+    Values and moving averages of `series` at a frequency, from `start` on.
+    Weekly bars take the last value of each week (to Friday). MAs (in bars of
+    the chosen frequency) run over the full history before the slice.
+    Returns a long frame: SERIES, DATE, VALUE, MA<n>...
+    """
+    rule = FREQUENCIES[frequency]
+    frames = []
+    for name in series:
+        values = store.loc[store['SERIES'] == name].set_index('DATE')['VALUE']
+        if rule is not None:
+            values = values.resample(rule).last().dropna()
+        frame = pd.DataFrame({'VALUE': values})
+        for window in windows:
+            frame[f'MA{window}'] = sma(values, window)
+        if start is not None:
+            frame = frame[frame.index >= pd.Timestamp(start)]
+        frames.append(frame.reset_index().assign(SERIES=name))
+    if not frames:
+        return pd.DataFrame(columns=['SERIES', 'DATE', 'VALUE'] + [f'MA{w}' for w in windows])
+    return pd.concat(frames, ignore_index=True)[['SERIES', 'DATE', 'VALUE'] + [f'MA{w}' for w in windows]]
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["ingest"]:
+        sys.exit("usage: python -m utils.commodities ingest [PATH ...]")
+    counts = ingest(sys.argv[2:] or None)
+    for name, n in sorted(counts.items()):
+        print(f"{name}: {n} rows added/revised")
+    if not counts:
+        print("store up to date")
@@ -0,0 +1,168 @@
+#%%
+"""
+Company dashboard builders: financial statement tables and figure specs for
+one ticker, shared by Company_Dashboard.py and the batch report export.
+"""
+import pandas as pd
+import plotly.graph_objects as go
+
+from utils.cache import versioned_cache
+from utils.fig_spec import subplot_grid, trace, hline, update_axes, figure
+from utils.keycodes import IS, MARGIN, BS, CF, IS_ORDER
+
+
+#%% Financial data table
+def process_section(df_ticker, section, section_name, margin_section=False):
+    df_section = df_ticker[df_ticker['KEYCODE'].isin(section)]
+    section_table = df_section.pivot(index='KEYCODE', columns='DATE', values='VALUE')
+    section_table = section_table.reindex(section)
+    if margin_section:
+        section_table = section_table.map(lambda x: f"{x*100:.1f}%")
+    else:
+        section_table = section_table.map(lambda x: f"{x/1e9:,.1f}")
+    section_table.insert(0, 'SECTION', section_name)
+    return section_table
+
+def process_growth(df_ticker, section, section_name, IS_growth):
+    df_growth = df_ticker[df_ticker['KEYCODE'].isin(section)]
+    growth_table = df_growth.pivot(index='KEYCODE', columns='DATE', values='YoY')
+    growth_table = growth_table.reindex(section)
+    growth_table = growth_table.rename(index=IS_growth)
+    growth_table = growth_table.map(lambda x: f"{x*100:.1f}%")
+    growth_table.insert(0, 'SECTION', section_name)
+    return growth_table
+
+@versioned_cache()
+def create_fs_table_main(df, ticker: str) -> pd.DataFrame:
+    df_temp = df.copy()
+    df_ticker = df_temp[df_temp['TICKER'] == ticker]
+    IS_growth = {i: f"{i}_Gr" for i in IS}
+    IS_table = process_section(df_ticker, IS, 'IS')
+    GR_table = process_growth(df_ticker, IS, 'IS_GROWTH', IS_growth)
+    MARGIN_table = process_section(df_ticker, MARGIN, 'MARGIN', margin_section=True)
+    fs_table = pd.concat([IS_table, GR_table, MARGIN_table])
+    fs_table = fs_table.drop(columns='SECTION')
+    fs_table = fs_table.reindex(index=IS_ORDER)
+    return fs_table
+
+@versioned_cache()
+def create_bs_table(df, ticker: str) -> pd.DataFrame:
+    df_temp = df.copy()
+    df_ticker = df_temp[df_temp['TICKER'] == ticker]
+    df_section = df_ticker[df_ticker['KEYCODE'].isin(BS)]
+    section_table = df_section.pivot(index='KEYCODE', columns='DATE', values='VALUE')
+    section_table = section_table.reindex(BS)
+    section_table = section_table.map(lambda x: f"{x/1e9:,.1f}")
+    return section_table
+
+@versioned_cache()
+def create_cf_table(df, ticker: str) -> pd.DataFrame:
+    df_temp = df.copy()
+    df_ticker = df_temp[df_temp['TICKER'] == ticker]
+    df_section = df_ticker[df_ticker['KEYCODE'].isin(CF)]
+    section_table = df_section.pivot(index='KEYCODE', columns='DATE', values='VALUE')
+    section_table = section_table.reindex(CF)
+    section_table = section_table.map(lambda x: f"{x/1e9:,.1f}")
+    return section_table
+
+#%% Plotting key FA data
+def create_subplot_figure(df_ticker, plot_cols, ma, subplot_titles, yaxis_suffix, title, rows, colors):
+    layout = subplot_grid(rows, 2, subplot_titles)
+    data = []
+    for idx, col in enumerate(plot_cols):
+        row = idx // 2 + 1
+        col_pos = idx % 2 + 1
+        color = colors[idx % len(colors)]
+        data.append(trace('bar', row, col_pos, 2, x=df_ticker.index, y=df_ticker[col], name=col, marker=dict(color=color)))
+        data.append(trace('scatter', row, col_pos, 2, x=df_ticker.index, y=ma[col], mode='lines', name=f'{col} MA(4)', line=dict(color='red')))
+    layout.update(
+        title=dict(text=title),
+        showlegend=False,
+        height=400 * rows,
+        width=1200,
+        template="plotly_white"
+    )
+    update_axes(layout, 'y', ticksuffix=yaxis_suffix)
+    return figure(data, layout)
+
+@versioned_cache()
+def create_FA_plots(df, ticker: str):
+    df_temp = df.copy()
+    df_ticker = df_temp[(df_temp.TICKER == ticker) & (df_temp.KEYCODE.isin(IS))]
+    df_ticker = df_ticker.pivot(index='DATE', columns='KEYCODE', values='VALUE') / 1e9
+    plot_cols = [col for col in ['Net_Revenue', 'Gross_Profit', 'EBIT', 'NPATMI'] if col in df_ticker.columns]
+    if not plot_cols:
+        return go.Figure()
+    ma = df_ticker[plot_cols].rolling(window=4, min_periods=1).mean()
+    subplot_titles = [col.replace('_', ' ') for col in plot_cols]
+    rows = (len(plot_cols) + 1) // 2
+    colors = ['royalblue', 'darkorange', 'green', 'gray']
+    return create_subplot_figure(df_ticker, plot_cols, ma, subplot_titles, "bn", "Income Statement Overview - " + ticker, rows, colors)
+
+@versioned_cache()
+def create_gr_plots(df, ticker: str):
+    df_temp = df.copy()
+    df_ticker = df_temp[(df_temp.TICKER == ticker) & (df_temp.KEYCODE.isin(IS))]
+    df_ticker = df_ticker.pivot(index='DATE', columns='KEYCODE', values='YoY') * 100
+    plot_cols = [col for col in ['Net_Revenue', 'Gross_Profit', 'EBIT', 'NPATMI'] if col in df_ticker.columns]
+    if not plot_cols:
+        return go.Figure()
+    ma = df_ticker[plot_cols].rolling(window=4, min_periods=1).mean()
+    subplot_titles = [col.replace('_', ' ') for col in plot_cols]
+    rows = (len(plot_cols) + 1) // 2
+    colors = ['royalblue', 'darkorange', 'green', 'gray']
+    return create_subplot_figure(df_ticker, plot_cols, ma, subplot_titles, "%", "Income Statement Overview - " + ticker, rows, colors)
+
+@versioned_cache()
+def create_margin_plots(df, ticker: str):
+    df_temp = df.copy()
+    df_ticker = df_temp[(df_temp.TICKER == ticker) & (df_temp.KEYCODE.isin(MARGIN))]
+    df_ticker = df_ticker.pivot(index='DATE', columns='KEYCODE', values='VALUE') * 100
+    plot_cols = [col for col in ['Gross_Margin', 'EBIT_Margin', 'EBITDA_Margin', 'NPAT_Margin'] if col in df_ticker.columns]
+    if not plot_cols:
+        return go.Figure()
+    ma = df_ticker[plot_cols].rolling(window=4, min_periods=1).mean()
+    subplot_titles = [col.replace('_', ' ') for col in plot_cols]
+    rows = (len(plot_cols) + 1) // 2
+    colors = ['royalblue', 'darkorange', 'green', 'gray']
+    return create_subplot_figure(df_ticker, plot_cols, ma, subplot_titles, "%", "Margins Overview - " + ticker, rows, colors)
+
+@versioned_cache()
+def create_bank_plots(df, ticker: str):
+    df_temp = df.copy()
+    df_ticker = df_temp[df_temp.TICKER == ticker].copy()
+    plot_cols = [col for col in ['PPOP', 'Provision for credit losses', 'COF from loan' , 'Loan yield', 'NIM', 'NPL (3-5)'] if col in df_ticker.columns]
+    for col in ['NIM','Loan yield', 'NPL (3-5)','COF from loan']:
+        if col in df_ticker.columns:
+            df_ticker[col] = df_ticker[col] * 100
+    if not plot_cols:
+        return go.Figure()
+    ma = df_ticker[plot_cols].rolling(window=4, min_periods=1).mean()
+    subplot_titles = [col.replace('_', ' ') for col in plot_cols]
+    rows = (len(plot_cols) + 1) // 2
+    colors = ['royalblue', 'darkorange', 'green', 'gray']
+    return create_subplot_figure(df_ticker.set_index('DATE'), plot_cols, ma, subplot_titles, "", "Bank Supplement Overview - " + ticker, rows, colors)
+
+# Plot P/E and P/B with dotted line for average and +1 and -1 standard deviation
+@versioned_cache()
+def create_pe_pb_plot(df, ticker):
+    df_temp = df.copy()
+    df_ticker = df_temp[df_temp['TICKER'] == ticker]
+    metrics = ['P/E', 'P/B', 'P/S']
+
+    layout = subplot_grid(3, 1, [f"{ticker} {m} Ratio" for m in metrics], vertical_spacing=0.05, shared_xaxes=True)
+    data, shapes = [], []
+    for row, metric in enumerate(metrics, start=1):
+        metric_data = df_ticker.pivot(index='TRADE_DATE', columns='TICKER', values=metric)
+        metric_data = metric_data.ffill()  # Forward fill to handle missing values
+
+        # Calculate mean and standard deviation
+        mean = metric_data[ticker].mean()
+        std = metric_data[ticker].std()
+
+        data.append(trace('scatter', row, 1, 1, x=metric_data.index, y=metric_data[ticker], mode='lines', name=metric, line=dict(color='green')))
+        for level, color in [(mean, 'red'), (mean + std, 'grey'), (mean - std, 'grey'), (mean + 2 * std, 'blue'), (mean - 2 * std, 'blue')]:
+            shapes.append(hline(level, row, 1, 1, dash='dash', color=color, width=1))
+
+    layout.update(shapes=shapes, height=1200)
+    return figure(data, layout)
@@ -0,0 +1,135 @@
+#%%
+"""
+Dataset loading shared by all dashboard pages.
+
+Two loader modes are supported:
+- "csv" (default): each process parses the CSV files in /data itself.
+- "shared": a one-shot builder (`python -m utils.datasets build`) writes every
+  dataset to an Arrow IPC file under /data/shared, and each Streamlit worker
+  memory-maps those files read-only. The frames returned are Arrow-backed, so
+  all workers on a host share the same physical pages instead of holding their
+  own parsed copy.
+
+The mode is selected with the DASHBOARD_DATA_MODE environment variable.
+Datasets seeded into the quarter partition store (utils.partitions, fed by
+`python -m utils.ingest`) are read from there in either mode; in shared mode
+its partitions are memory-mapped the same way.
+"""
+import os
+import sys
+import threading
+from functools import partial
+
+import pandas as pd
+
+from utils.cache import set_version
+from utils.partitions import get_manifest_path, read_store
+from utils.utils import get_data_path, get_shared_data_path, get_temp_path
+
+DATASETS = [
+    "FA_processed.csv",
+    "Val_processed.csv",
+    "MktCap_processed.csv",
+    "BankSupp_processed.csv",
+    "df_q_full.csv",
+    "df_q_full_formatted.csv",
+    "df_a_full_formatted.csv",
+]
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+#%% Loader
+def shared_mode_enabled() -> bool:
+    return os.environ.get("DASHBOARD_DATA_MODE", "csv").lower() == "shared"
+
+def _read_shared(path):
+    """
+    Memory-map an Arrow IPC file and wrap it as a DataFrame without copying.
+    The mapping stays alive for as long as the returned frame references it.
+    """
+    import pyarrow as pa
+
+    source = pa.memory_map(str(path), "r")
+    table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+def _resolve(filename):
+    manifest_path = get_manifest_path(filename)
+    if manifest_path.exists():
+        return manifest_path, partial(read_store, shared=shared_mode_enabled())
+    shared_path = get_shared_data_path(filename)
+    if shared_mode_enabled() and shared_path.exists():
+        return shared_path, _read_shared
+    return get_data_path(filename), pd.read_csv
+
+def dataset_version(filename: str):
+    """
+    Cheap change token for a dataset: (path read, mtime). Use it as a cache key
+    for anything derived from the dataset instead of hashing the frame.
+    """
+    path, _ = _resolve(filename)
+    return (str(path), path.stat().st_mtime_ns)
+
+def read_dataset(filename: str) -> pd.DataFrame:
+    """
+    Load a dataset from /data by its CSV filename.
+
+    Parsed frames are kept per process and reused until the file on disk
+    changes, so Streamlit reruns do not re-read the file. A shallow copy is
+    returned so pages can add columns without affecting other sessions; it is
+    tagged with the dataset version for `utils.cache.versioned_cache`.
+    """
+    path, reader = _resolve(filename)
+    version = (str(path), path.stat().st_mtime_ns)
+    with _lock:
+        cached = _loaded.get(filename)
+        if cached is None or cached[0] != version:
+            cached = (version, reader(path))
+            _loaded[filename] = cached
+    return set_version(cached[1].copy(deep=False), (filename,) + version)
+
+
+#%% Builder
+def build_shared_datasets(filenames=DATASETS):
+    """
+    Write each CSV dataset to its Arrow IPC file under /data/shared.
+    Files are written uncompressed (so they can be mapped as-is) and swapped in
+    atomically, so running workers keep their old mapping until they reload.
+    """
+    built = []
+    for filename in filenames:
+        csv_path = get_data_path(filename)
+        if not csv_path.exists():
+            print(f"skip {filename}: not found")
+            continue
+        out_path = get_shared_data_path(filename)
+        table = write_shared(csv_path, out_path)
+        built.append(out_path)
+        print(f"built {out_path.name}: {table.num_rows} rows, {table.nbytes / 1e6:.1f} MB")
+    return built
+
+def write_shared(csv_path, out_path):
+    """
+    Convert one CSV to an uncompressed Arrow IPC file, swapped in atomically.
+    """
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(pd.read_csv(csv_path), preserve_index=False)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = get_temp_path(out_path)
+    try:
+        with pa.OSFile(str(tmp_path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, out_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return table
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["build"]:
+        sys.exit("usage: python -m utils.datasets build [FILENAME ...]")
+    build_shared_datasets(sys.argv[2:] or DATASETS)
@@ -0,0 +1,127 @@
+#%%
+"""
+Lightweight Plotly figure specs built as plain dicts.
+
+`make_subplots` + `fig.add_trace(..., row=, col=)` + `fig.add_hline` run
+Plotly's property validation on every call. The helpers here assemble the
+same trace/layout dicts directly (subplot domains, axis anchors, title
+annotations and hline shapes are computed the way `make_subplots` does) and
+the result is handed straight to `st.plotly_chart`, which validates the whole
+figure once. See benchmarks/fig_spec_bench.py for the comparison.
+"""
+from functools import lru_cache
+import copy
+
+import plotly.graph_objects as go
+
+
+#%% Subplot grid
+def _domain(start, end):
+    # Clamp float drift so the bounds pass Plotly's [0, 1] validation
+    return (min(max(round(start, 12), 0.0), 1.0), min(max(round(end, 12), 0.0), 1.0))
+
+@lru_cache(maxsize=64)
+def _grid_geometry(rows, cols, horizontal_spacing, vertical_spacing, row_heights=None):
+    """
+    Axis domains per cell, matching make_subplots' default layout.
+    Returns {(row, col): (x_domain, y_domain)} with 1-based row/col, row 1 on top.
+    """
+    width = (1 - horizontal_spacing * (cols - 1)) / cols
+    heights = row_heights or (1,) * rows
+    total = sum(heights)
+    usable = 1 - vertical_spacing * (rows - 1)
+    geometry = {}
+    top = 1.0
+    for r in range(1, rows + 1):
+        height = usable * heights[r - 1] / total
+        for c in range(1, cols + 1):
+            x0 = (c - 1) * (width + horizontal_spacing)
+            geometry[(r, c)] = (_domain(x0, x0 + width), _domain(top - height, top))
+        top -= height + vertical_spacing
+    return geometry
+
+def axis_refs(row, col, cols):
+    """
+    Trace axis references ('x', 'y'), ('x2', 'y2'), ... for a grid cell.
+    """
+    k = (row - 1) * cols + col
+    suffix = "" if k == 1 else str(k)
+    return "x" + suffix, "y" + suffix
+
+def subplot_grid(rows, cols, subplot_titles=(), horizontal_spacing=None, vertical_spacing=None,
+                 shared_xaxes=False, row_heights=None):
+    """
+    Layout dict with the axes and title annotations of a rows x cols grid.
+    With shared_xaxes, each column's x axes follow the bottom one and only the
+    bottom row shows tick labels.
+    """
+    horizontal_spacing = 0.2 / cols if horizontal_spacing is None else horizontal_spacing
+    if vertical_spacing is None:
+        vertical_spacing = (0.5 if subplot_titles else 0.3) / rows
+    geometry = _grid_geometry(rows, cols, horizontal_spacing, vertical_spacing,
+                              tuple(row_heights) if row_heights else None)
+    layout = {"annotations": []}
+    for (r, c), (x_domain, y_domain) in geometry.items():
+        x, y = axis_refs(r, c, cols)
+        xaxis = {"anchor": y, "domain": list(x_domain)}
+        if shared_xaxes and r < rows:
+            xaxis["matches"] = axis_refs(rows, c, cols)[0]
+            xaxis["showticklabels"] = False
+        layout["xaxis" + x[1:]] = xaxis
+        layout["yaxis" + y[1:]] = {"anchor": x, "domain": list(y_domain)}
+    for i, title in enumerate(subplot_titles):
+        if i >= rows * cols or not title:
+            continue
+        x_domain, y_domain = geometry[(i // cols + 1, i % cols + 1)]
+        layout["annotations"].append({
+            "text": title, "showarrow": False, "font": {"size": 16},
+            "x": (x_domain[0] + x_domain[1]) / 2, "xref": "paper", "xanchor": "center",
+            "y": y_domain[1], "yref": "paper", "yanchor": "bottom",
+        })
+    return layout
+
+def two_column_grid(n_panels, subplot_titles=(), **kwargs):
+    """
+    The 2-column grid shared by the dashboard's multi-panel charts.
+    Returns (layout, rows).
+    """
+    rows = max((n_panels + 1) // 2, 1)
+    return subplot_grid(rows, 2, subplot_titles, **kwargs), rows
+
+def update_axes(layout, axis, **props):
+    """
+    Apply props to every x or y axis in the layout (like fig.update_yaxes).
+    """
+    for key, value in layout.items():
+        if key.startswith(axis + "axis"):
+            value.update(copy.deepcopy(props))
+
+
+#%% Traces and shapes
+def trace(trace_type, row=None, col=None, cols=None, **props):
+    """
+    Trace dict placed in a grid cell (row/col/cols) or on the default axes.
+    """
+    spec = {"type": trace_type, **props}
+    if row is not None:
+        spec["xaxis"], spec["yaxis"] = axis_refs(row, col, cols)
+    return spec
+
+def hline(y, row=1, col=1, cols=1, **line):
+    """
+    Horizontal line shape across one subplot, as fig.add_hline draws it.
+    """
+    x, y_ref = axis_refs(row, col, cols)
+    return {
+        "type": "line", "xref": f"{x} domain", "x0": 0, "x1": 1,
+        "yref": y_ref, "y0": y, "y1": y, "line": line,
+    }
+
+def figure(data, layout):
+    """
+    Figure spec for st.plotly_chart. Streamlit rejects a spec without traces,
+    so an empty chart falls back to a (cheap) empty go.Figure.
+    """
+    if not data:
+        return go.Figure(layout=layout)
+    return {"data": data, "layout": layout}
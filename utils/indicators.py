@@ -0,0 +1,108 @@
+#%%
+"""
+Technical indicators over OHLCV bars.
+
+Every kernel takes pandas Series or wide DataFrames (index = date, one column
+per symbol) and uses pandas rolling/ewm kernels, so a batch of symbols is one
+vectorized call instead of a loop. EMA-style indicators use adjust=False
+recursions, which lets `update_indicators` recompute only the tail of a
+cached frame when new bars append.
+"""
+import numpy as np
+import pandas as pd
+
+# Bars recomputed before the first new bar on incremental updates. Covers the
+# longest rolling window exactly; EMA/Wilder seeds decay below 1e-8 within it.
+INCREMENTAL_WARMUP = 500
+
+
+#%% Kernels
+def sma(close, window):
+    return close.rolling(window, min_periods=window).mean()
+
+def ema(close, span):
+    return close.ewm(span=span, adjust=False, min_periods=span).mean()
+
+def rsi(close, window=14):
+    """
+    Wilder's RSI.
+    """
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    return 100 - 100 / (1 + gain / loss)
+
+def atr(high, low, close, window=14):
+    """
+    Wilder's Average True Range.
+    """
+    prev_close = close.shift(1)
+    true_range = np.maximum(high - low, np.maximum((high - prev_close).abs(), (low - prev_close).abs()))
+    return true_range.ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+
+def bollinger(close, window=20, k=2):
+    """
+    Returns (middle, upper, lower) bands.
+    """
+    mid = close.rolling(window, min_periods=window).mean()
+    std = close.rolling(window, min_periods=window).std(ddof=0)
+    return mid, mid + k * std, mid - k * std
+
+
+#%% Indicator set
+# name -> function of the OHLCV fields returning one or more output columns
+INDICATORS = {
+    "MA20": lambda d: {"MA20": sma(d["close"], 20)},
+    "MA50": lambda d: {"MA50": sma(d["close"], 50)},
+    "MA200": lambda d: {"MA200": sma(d["close"], 200)},
+    "EMA20": lambda d: {"EMA20": ema(d["close"], 20)},
+    "EMA50": lambda d: {"EMA50": ema(d["close"], 50)},
+    "RSI14": lambda d: {"RSI14": rsi(d["close"], 14)},
+    "ATR14": lambda d: {"ATR14": atr(d["high"], d["low"], d["close"], 14)},
+    "BB20": lambda d: dict(zip(["BB20_MID", "BB20_UPPER", "BB20_LOWER"], bollinger(d["close"], 20, 2))),
+    "VOL20": lambda d: {"VOL20": sma(d["volume"], 20)},
+}
+
+def compute_indicators(bars, names=INDICATORS):
+    """
+    Compute indicators for one symbol's OHLCV frame.
+    Returns a frame with the bar dates and one column per indicator output.
+    """
+    fields = {f: bars[f].astype("float64") for f in ["open", "high", "low", "close", "volume"]}
+    out = {"date": bars["date"]}
+    for name in names:
+        out.update(INDICATORS[name](fields))
+    return pd.DataFrame(out).reset_index(drop=True)
+
+def compute_indicators_batch(frames, names=INDICATORS):
+    """
+    Compute indicators for many symbols at once.
+    frames: {symbol: OHLCV frame}. Bars are aligned on date into wide
+    (date x symbol) matrices so each indicator is a single rolling call.
+    Returns {output column: wide DataFrame}.
+    """
+    fields = {
+        f: pd.DataFrame({s: df.set_index("date")[f] for s, df in frames.items()}).astype("float64")
+        for f in ["open", "high", "low", "close", "volume"]
+    }
+    out = {}
+    for name in names:
+        out.update(INDICATORS[name](fields))
+    return out
+
+def update_indicators(bars, cached, names=INDICATORS):
+    """
+    Extend a cached indicator frame to cover `bars` by recomputing only from
+    the last cached bar (which may have been revised) onwards, with
+    INCREMENTAL_WARMUP bars of history in front. Falls back to a full
+    computation when the cache does not line up with the bars.
+    """
+    columns = compute_indicators(bars.head(0), names).columns
+    if cached is None or cached.empty or list(cached.columns) != list(columns):
+        return compute_indicators(bars, names)
+    first_new = len(cached) - 1
+    if first_new >= len(bars) or bars["date"].iloc[first_new] != cached["date"].iloc[-1]:
+        return compute_indicators(bars, names)
+    warm_start = max(first_new - INCREMENTAL_WARMUP, 0)
+    tail = compute_indicators(bars.iloc[warm_start:], names).iloc[first_new - warm_start:]
+    return pd.concat([cached.iloc[:first_new], tail], ignore_index=True)
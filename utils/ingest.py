@@ -0,0 +1,242 @@
+#%%
+"""
+Incremental ingest of new reporting periods into the partition store.
+
+    python -m utils.ingest seed [FILENAME ...]          # split the CSVs into partitions once
+    python -m utils.ingest add [--allow-gaps] FILENAME EXTRACT.csv ...  # upsert a new quarter's rows
+
+`add` upserts the extract's rows by the dataset key (TICKER, YEARREPORT,
+LENGTHREPORT / DATE) into the periods they belong to and recomputes only the
+derived values of those periods:
+- bank datasets: the group rows (INDUSTRY, SOCB, 1, 2, 3): items and CA
+  amounts as sums of the member banks', CA ratios from those sums. A ratio
+  that has no formula (see CA_RATIOS) and is not in the extract fails the
+  ingest unless --allow-gaps is given;
+- FA_processed: YoY of the ingested periods and of the periods a year later.
+Everything else downstream (latest-value snapshot, builder caches) is keyed on
+the dataset version, so running app processes pick the new partition up on
+their next rerun without a restart.
+"""
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+from utils import bank, partitions
+from utils.partitions import PARTITIONED, period_labels, read_period, write_periods
+from utils.utils import get_data_path
+
+BANK_DATASETS = ["df_q_full.csv", "df_q_full_formatted.csv", "df_a_full_formatted.csv"]
+GROUP_TICKERS = ['INDUSTRY', 'SOCB', '1', '2', '3']
+
+
+#%% Derived values
+# Group CA ratios from the group's summed amounts (CA amounts in bn VND, like
+# the items): (numerator terms, '-' to subtract, denominator, annualized).
+# Annualized ratios scale a quarter's flow by 4; CASA, receivables/loan, LDR
+# and fair LDR are not derivable from the stored items.
+CA_RATIOS = {
+    'CA.1': (['BS.13'], 'BS.56', False),
+    'CA.5': (['CA.4'], 'Nt.65', False),
+    'CA.6': (['Nt.70'], 'Nt.65', False),
+    'CA.7': (['Nt.67'], 'Nt.65', False),
+    'CA.8': (['Nt.114'], 'Nt.65', False),
+    'CA.10': (['CA.9'], 'CA.34', False),
+    'CA.13': (['CA.12'], 'CA.34', False),
+    'CA.14': (['-IS.15'], 'IS.14', False),
+    'CA.15': (['BS.14'], 'CA.4', False),
+    'CA.17': (['-BS.14'], 'BS.13', False),
+    'CA.19': (['BS.54', '-BS.5'], 'BS.56', False),
+    'CA.20': (['BS.1'], 'BS.65', False),
+    'CA.25': (['IS.1'], 'CA.23', True),
+    'CA.26': (['-IS.2'], 'CA.24', True),
+    'CA.27': (['IS.3'], 'CA.23', True),
+    'CA.28': (['-IS.17'], 'IS.16', False),
+    'CA.31': (['IS.22'], 'CA.29', True),
+    'CA.32': (['IS.24'], 'CA.30', True),
+    'CA.35': (['Nt.143'], 'CA.34', True),
+    'CA.38': (['Nt.145'], 'CA.37', True),
+    'CA.41': (['Nt.144'], 'CA.40', True),
+    'CA.44': (['Nt.151'], 'CA.43', True),
+    'CA.47': (['Nt.152', 'Nt.154'], 'CA.46', True),
+    'CA.49': (['Nt.153'], 'BS.59', True),
+    'CA.50': (['-IS.17'], 'CA.34', False),
+    'CA.51': (['IS.6'], 'CA.29', False),
+    'CA.53': (['IS.6'], 'BS.13', False),
+}
+
+def _additive_columns(frame, ca_format):
+    return [c for c in frame.columns if c.startswith(('BS.', 'IS.', 'Nt.', 'BSA')) or ca_format.get(c) == 'abs']
+
+def _ratio(totals, formula, annual):
+    terms, denominator, annualized = formula
+    numerator = sum(-totals[t[1:]] if t.startswith('-') else totals[t] for t in terms)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = numerator / totals[denominator] * (4 if annualized and not annual else 1)
+    return value if np.isfinite(value) else np.nan
+
+def _stored(value, col, ca_format, formatted, as_text):
+    """
+    A df_q_full-unit value back in the column's storage format.
+    """
+    if pd.isna(value):
+        return np.nan
+    pct = ca_format.get(col) == 'pct'
+    if formatted and col in ca_format:
+        value = value * 100 if pct else value / 1e9
+    if not as_text:
+        return round(value, 2) if formatted and pct else value
+    return f"{value:.2f}%" if pct else f"{value:,.1f}"
+
+def bank_group_rows(period, classification, ca_format, formatted=False):
+    """
+    Recompute the group rows of one bank period (INDUSTRY = every classified
+    bank). Items and CA amounts are summed over the member banks; CA ratios
+    come from the summed amounts by CA_RATIOS. A ratio without a formula is
+    kept as stored/extracted. Returns (period, gaps), gaps listing the
+    (group, column) ratios left empty although the member banks report them.
+    """
+    groups = classification.set_index('TICKER')['GROUP']
+    is_group = period['TICKER'].astype(str).isin(GROUP_TICKERS)
+    banks = period[~is_group]
+    existing = period[is_group].set_index(period.loc[is_group, 'TICKER'].astype(str))
+    numeric = bank.to_numeric(banks, ca_format, formatted)
+    additive = _additive_columns(period, ca_format)
+    # CA amounts are in VND; the ratios mix them with bn items
+    scale = pd.Series({c: 1e-9 if c in ca_format else 1.0 for c in additive})
+    amounts = numeric[additive]
+    ratios = [c for c, fmt in ca_format.items() if fmt == 'pct' and c in period.columns]
+    member_group = banks['TICKER'].map(groups)
+    annual = (banks['LENGTHREPORT'].astype(int) == 5).all()
+
+    rows, gaps = [], []
+    for group in GROUP_TICKERS:
+        members = member_group.notna() if group == 'INDUSTRY' else (member_group == group)
+        if not members.any():
+            continue
+        if group in existing.index:
+            row = existing.loc[group].copy()
+        else:
+            row = banks.iloc[0].copy()
+            row[:] = np.nan
+            for col in ['YEARREPORT', 'LENGTHREPORT', 'PERIOD_INDEX']:
+                if col in banks.columns:
+                    row[col] = banks[col].iloc[0]
+            row['ORGANCODE'] = row['TICKER'] = group
+        totals = amounts[members.to_numpy()].sum(min_count=1)
+        values = totals.to_dict()
+        values.update({col: _ratio(totals * scale, CA_RATIOS[col], annual) for col in ratios if col in CA_RATIOS})
+        for col, value in values.items():
+            # Keep each column's storage type: formatted strings or plain numbers
+            row[col] = _stored(value, col, ca_format, formatted, banks[col].dtype == object)
+        reported = numeric.loc[members.to_numpy(), ratios].notna().any()
+        gaps += [(group, col) for col in ratios if pd.isna(row[col]) and reported[col]]
+        rows.append(row)
+    return pd.concat([banks, pd.DataFrame(rows)], ignore_index=True), gaps
+
+def _shift_year(label, years):
+    match = re.match(r'^(\d{4})(.*)$', label)
+    return f"{int(match.group(1)) + years}{match.group(2)}" if match else None
+
+def fa_yoy(current, prior):
+    """
+    YoY of each (TICKER, KEYCODE) against the same period a year earlier.
+    """
+    key = ['TICKER', 'KEYCODE']
+    if prior.empty:
+        return pd.Series(np.nan, index=current.index)
+    base = prior.drop_duplicates(key, keep='last').set_index(key)['VALUE']
+    base = base.reindex(pd.MultiIndex.from_frame(current[key])).to_numpy(dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        yoy = current['VALUE'].to_numpy(dtype='float64') / base - 1
+    yoy[~np.isfinite(yoy)] = np.nan
+    return pd.Series(yoy, index=current.index)
+
+
+#%% Ingest
+def _row_keys(frame, key):
+    return pd.MultiIndex.from_frame(frame[key].astype(str))
+
+def _align(new, reference):
+    """
+    Match the extract's columns and dtypes to the stored period. Formatted
+    amount columns are strings in storage; an extract column read back as
+    numbers (no thousands separator in it) is stored as strings too.
+    """
+    if reference.empty:
+        return new
+    new = new.reindex(columns=list(reference.columns) + [c for c in new.columns if c not in reference.columns])
+    for col in reference.columns:
+        if reference[col].dtype == object and new[col].dtype != object:
+            new[col] = new[col].astype(object).where(new[col].isna(), new[col].astype(str))
+    return new
+
+def ingest(filename, rows, allow_gaps=False):
+    """
+    Upsert `rows` into the partition store of `filename` and recompute the
+    derived values of the affected periods. Returns the periods rewritten.
+    Raises ValueError, before writing anything, if a group ratio cannot be
+    derived; with allow_gaps those ratios are left empty.
+    """
+    if partitions.read_manifest(filename) is None:
+        raise FileNotFoundError(f"{filename} has no partition store yet; run `python -m utils.ingest seed {filename}` first")
+    key = PARTITIONED[filename]
+    classification = None
+    if filename in BANK_DATASETS:
+        classification = bank.load_classification()
+        ca_format = bank.ca_formats(bank.load_keycode_mapping())
+
+    # A brand-new period takes its column layout from the latest stored one
+    stored = partitions.read_manifest(filename)['partitions']
+    latest = read_period(filename, max(stored)) if stored else pd.DataFrame()
+
+    updated, gaps = {}, []
+    for label, new in rows.groupby(period_labels(filename, rows), sort=False):
+        current = read_period(filename, label)
+        new = _align(new, current if not current.empty else latest)
+        if not current.empty:
+            current = current[~_row_keys(current, key).isin(_row_keys(new, key))]
+        period = pd.concat([current, new], ignore_index=True)
+        if classification is not None:
+            period, missing = bank_group_rows(period, classification, ca_format, 'formatted' in filename)
+            gaps += [f"{label} {group} {col}" for group, col in missing]
+        updated[label] = period
+
+    if filename == "FA_processed.csv":
+        # YoY of a period depends on the period a year earlier
+        for label in list(updated) + [_shift_year(l, 1) for l in updated]:
+            period = updated.get(label)
+            if period is None:
+                period = read_period(filename, label) if label else pd.DataFrame()
+            if period.empty:
+                continue
+            prior_label = _shift_year(label, -1)
+            prior = updated.get(prior_label)
+            if prior is None:
+                prior = read_period(filename, prior_label)
+            updated[label] = period.assign(YoY=fa_yoy(period, prior))
+
+    if gaps and not allow_gaps:
+        raise ValueError(f"{filename}: group ratios not derivable and missing from the extract: {', '.join(gaps)}")
+    write_periods(filename, updated)
+    return sorted(updated)
+
+
+if __name__ == "__main__":
+    command, args = sys.argv[1:2], sys.argv[2:]
+    if command == ["seed"]:
+        for filename in args or list(PARTITIONED):
+            path = get_data_path(filename)
+            if not path.exists():
+                print(f"skip {filename}: not found")
+                continue
+            partitions.seed(filename, pd.read_csv(path))
+            print(f"seeded {filename}: {len(partitions.read_manifest(filename)['partitions'])} periods")
+    elif command == ["add"] and len([a for a in args if a != "--allow-gaps"]) >= 2:
+        allow_gaps = "--allow-gaps" in args
+        args = [a for a in args if a != "--allow-gaps"]
+        rows = pd.concat([pd.read_csv(path) for path in args[1:]], ignore_index=True)
+        print(f"{args[0]}: rewrote {', '.join(ingest(args[0], rows, allow_gaps))}")
+    else:
+        sys.exit("usage: python -m utils.ingest seed [FILENAME ...] | add [--allow-gaps] FILENAME EXTRACT.csv [...]")
@@ -0,0 +1,17 @@
+"""
+FA keycode groups shared by the Company dashboard and the screener.
+"""
+IS = ['Net_Revenue','Gross_Profit', 'EBIT', 'EBITDA',  'NPATMI']
+MARGIN = ['Gross_Margin', 'EBIT_Margin', 'EBITDA_Margin','NPAT_Margin']
+BS = [
+    'Total_Asset', 'Cash', 'Cash_Equivalent', 'Inventory', 'Account_Receivable',
+    'Tangible_Fixed_Asset', 'Total_Liabilities', 'ST_Debt', 'LT_Debt',
+    'TOTAL_Equity','Invested_Capital'
+]
+CF = ['Operating_CF', 'Dep_Expense', 'Inv_CF', 'Capex', 'Fin_CF', 'FCF']
+
+IS_ORDER = [
+    "Net_Revenue", "Net_Revenue_Gr", "Gross_Profit", "Gross_Profit_Gr", "Gross_Margin",
+    "EBIT", "EBIT_Gr", "EBIT_Margin", "EBITDA", "EBITDA_Gr", "EBITDA_Margin",
+    "NPATMI", "NPATMI_Gr", "NPAT_Margin"
+]
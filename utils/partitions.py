@@ -0,0 +1,171 @@
+#%%
+"""
+Quarter-partitioned storage for the reporting datasets.
+
+Each dataset lives under data/partitions/<stem>/ as one Arrow IPC file per
+reporting period plus a manifest.json listing them. Partition files are never
+rewritten: an ingest writes the periods it touches as new files named after
+the next generation (2024Q4.7.arrow, ...), swaps the manifest in atomically to
+point at them and only then deletes the files no manifest refers to, so:
+- readers see either the old or the new set of partitions, never a mix;
+- the manifest mtime is the dataset's change token (see utils.datasets);
+- a reload only parses partitions whose file changed.
+In shared mode (see utils.datasets) partitions are memory-mapped and returned
+as Arrow-backed frames, so workers share their pages as with data/shared.
+"""
+import json
+import os
+import threading
+
+import pandas as pd
+
+from utils.utils import get_project_root, get_temp_path
+
+# Row key and period label of each partitioned dataset
+PARTITIONED = {
+    "df_q_full.csv": ['TICKER', 'YEARREPORT', 'LENGTHREPORT'],
+    "df_q_full_formatted.csv": ['TICKER', 'YEARREPORT', 'LENGTHREPORT'],
+    "df_a_full_formatted.csv": ['TICKER', 'YEARREPORT', 'LENGTHREPORT'],
+    "BankSupp_processed.csv": ['TICKER', 'DATE'],
+    "FA_processed.csv": ['TICKER', 'KEYCODE', 'DATE'],
+}
+
+_partitions = {}  # (path, shared) -> (mtime_ns, frame or mapped table)
+_lock = threading.Lock()
+
+
+#%% Layout
+def get_partition_dir(filename):
+    return get_project_root() / "data" / "partitions" / os.path.splitext(filename)[0]
+
+def get_manifest_path(filename):
+    return get_partition_dir(filename) / "manifest.json"
+
+def period_labels(filename, frame):
+    """
+    Partition label of each row: YYYYQn from YEARREPORT/LENGTHREPORT (annual
+    rows have LENGTHREPORT 5), else the DATE column.
+    """
+    if 'LENGTHREPORT' in PARTITIONED[filename]:
+        return frame['YEARREPORT'].astype(int).astype(str) + 'Q' + frame['LENGTHREPORT'].astype(int).astype(str)
+    return frame['DATE'].astype(str)
+
+def read_manifest(filename):
+    path = get_manifest_path(filename)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+def _write_manifest(filename, manifest):
+    path = get_manifest_path(filename)
+    tmp_path = get_temp_path(path)
+    try:
+        tmp_path.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+#%% Read
+def _read_partition(path, shared=False):
+    """
+    One partition: a pandas frame, or in shared mode the memory-mapped table.
+    """
+    import pyarrow as pa
+
+    mtime = path.stat().st_mtime_ns
+    with _lock:
+        cached = _partitions.get((path, shared))
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    if shared:
+        # The mapping stays alive for as long as the table references it
+        data = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    else:
+        with pa.memory_map(str(path), "r") as source:
+            data = pa.ipc.open_file(source).read_all().to_pandas()
+    with _lock:
+        _partitions[(path, shared)] = (mtime, data)
+    return data
+
+def read_period(filename, label):
+    """
+    Rows of one period (empty frame when the period is not stored yet).
+    """
+    manifest = read_manifest(filename) or {'partitions': {}}
+    entry = manifest['partitions'].get(label)
+    if entry is None:
+        return pd.DataFrame()
+    return _read_partition(get_partition_dir(filename) / entry['file'])
+
+def _read_files(manifest_path, shared):
+    manifest = json.loads(manifest_path.read_text())
+    paths = [manifest_path.parent / manifest['partitions'][label]['file'] for label in sorted(manifest['partitions'])]
+    parts = [_read_partition(path, shared) for path in paths]
+    with _lock:
+        # Files of superseded generations are deleted; drop their cache entries too
+        for key in [k for k in _partitions if k[0].parent == manifest_path.parent and k[0] not in paths]:
+            del _partitions[key]
+    return manifest['columns'], parts
+
+def read_store(manifest_path, shared=False):
+    """
+    Full dataset from its manifest, periods in chronological order.
+    Unchanged partitions come from the per-process cache. shared: concatenate
+    the memory-mapped tables without copying into an Arrow-backed frame.
+    """
+    import pyarrow as pa
+
+    try:
+        columns, parts = _read_files(manifest_path, shared)
+    except FileNotFoundError:
+        # An ingest swapped the manifest and collected the old files after we read it
+        columns, parts = _read_files(manifest_path, shared)
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    if not shared:
+        return pd.concat(parts, ignore_index=True).reindex(columns=columns)
+    table = pa.concat_tables(parts, promote_options="permissive")
+    table = table.select([c for c in columns if c in table.column_names])
+    return table.to_pandas(types_mapper=pd.ArrowDtype).reindex(columns=columns)
+
+
+#%% Write
+def write_periods(filename, frames):
+    """
+    Replace whole periods. frames: {label: DataFrame}. The new partition files
+    are written first, then the manifest is swapped in to publish them, then
+    files no longer in the manifest are deleted.
+    """
+    import pyarrow as pa
+
+    directory = get_partition_dir(filename)
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(filename) or {'dataset': filename, 'key': PARTITIONED[filename],
+                                           'columns': [], 'partitions': {}}
+    manifest['generation'] = manifest.get('generation', 0) + 1
+    for label, frame in frames.items():
+        table = pa.Table.from_pandas(frame.reset_index(drop=True), preserve_index=False)
+        path = directory / f"{label}.{manifest['generation']}.arrow"
+        tmp_path = get_temp_path(path)
+        try:
+            with pa.OSFile(str(tmp_path), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        manifest['partitions'][label] = {'file': path.name, 'rows': len(frame)}
+        manifest['columns'] += [c for c in frame.columns if c not in manifest['columns']]
+    _write_manifest(filename, manifest)
+    live = {entry['file'] for entry in manifest['partitions'].values()}
+    for path in directory.glob("*.arrow"):
+        if path.name not in live:
+            path.unlink(missing_ok=True)
+
+def seed(filename, frame):
+    """
+    Split a full dataset into period partitions.
+    """
+    labels = period_labels(filename, frame)
+    write_periods(filename, {label: part for label, part in frame.groupby(labels, sort=False)})
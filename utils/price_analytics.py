@@ -0,0 +1,166 @@
+#%%
+"""
+Cross-sectional price analytics over the local price store.
+
+Daily closes for a universe of tickers are aligned into one dense
+date x ticker matrix, and correlation, beta and volatility are computed on the
+whole matrix with NumPy/pandas kernels instead of pair by pair.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.utils import get_data_path
+
+BENCHMARK = "VNINDEX"
+TRADING_DAYS = 252
+
+
+#%% Universe and price matrix
+def get_sectors():
+    """
+    L2 sectors in STOCK LIST.xlsx.
+    """
+    stock_list = pd.read_excel(get_data_path("STOCK LIST.xlsx"))
+    return sorted(stock_list['L2'].dropna().unique())
+
+def get_universe(l2=None):
+    """
+    Tickers from STOCK LIST.xlsx, optionally restricted to one L2 sector.
+    """
+    stock_list = pd.read_excel(get_data_path("STOCK LIST.xlsx"))
+    if l2 is not None:
+        stock_list = stock_list[stock_list['L2'] == l2]
+    return stock_list['Ticker'].dropna().unique().tolist()
+
+def load_bar_frames(tickers, max_workers=4):
+    """
+    {ticker: daily OHLCV frame} from the SSI price layer, so warm tickers are
+    local reads; tickers that cannot be loaded are left out.
+    """
+    from SSI_API import get_price_bars
+
+    def load(ticker):
+        try:
+            bars, _ = get_price_bars(ticker)
+        except Exception:
+            return ticker, None
+        return ticker, bars
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return {t: bars for t, bars in pool.map(load, tickers) if bars is not None and not bars.empty}
+
+def close_matrix(frames, start_date=None):
+    """
+    Daily closes of `frames` as a date x ticker matrix (float64, NaN where a
+    ticker did not trade).
+    """
+    if not frames:
+        return pd.DataFrame()
+    matrix = pd.concat({t: bars.set_index('date')['close'] for t, bars in frames.items()}, axis=1).sort_index()
+    if start_date is not None:
+        matrix = matrix[matrix.index >= pd.Timestamp(start_date)]
+    return matrix.astype('float64')
+
+def load_close_matrix(tickers, start_date=None, max_workers=4):
+    """
+    Daily closes for `tickers` as a date x ticker matrix (see close_matrix).
+    """
+    return close_matrix(load_bar_frames(tickers, max_workers), start_date)
+
+def daily_returns(close):
+    return close.pct_change(fill_method=None)
+
+
+#%% Correlation
+def correlation_matrix(returns, min_periods=60, block_size=256):
+    """
+    Pairwise-complete Pearson correlation of every column pair.
+
+    Missing values are masked and the sums over each pair's overlapping
+    observations are formed with matrix products, one block of rows at a time,
+    so memory stays at O(block_size x n_tickers) on top of the inputs.
+    Pairs with fewer than `min_periods` overlapping days are NaN.
+    """
+    x = returns.to_numpy(dtype='float64')
+    m = (~np.isnan(x)).astype('float64')
+    x0 = np.where(m > 0, x, 0.0)
+    x0_sq = x0 * x0
+    n_cols = x.shape[1]
+    corr = np.full((n_cols, n_cols), np.nan)
+
+    for start in range(0, n_cols, block_size):
+        stop = min(start + block_size, n_cols)
+        xb, mb, xb_sq = x0[:, start:stop], m[:, start:stop], x0_sq[:, start:stop]
+        n = mb.T @ m
+        sum_x = xb.T @ m
+        sum_y = mb.T @ x0
+        sum_xy = xb.T @ x0
+        sum_xx = xb_sq.T @ m
+        sum_yy = mb.T @ x0_sq
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = sum_xy - sum_x * sum_y / n
+            var_x = sum_xx - sum_x ** 2 / n
+            var_y = sum_yy - sum_y ** 2 / n
+            block = cov / np.sqrt(var_x * var_y)
+        block[n < min_periods] = np.nan
+        corr[start:stop] = np.clip(block, -1.0, 1.0)
+
+    return pd.DataFrame(corr, index=returns.columns, columns=returns.columns)
+
+
+#%% Beta and volatility
+def rolling_beta(returns, benchmark_returns, window=60):
+    """
+    Rolling beta of every column against the benchmark return series.
+    """
+    min_periods = window // 2
+    cov = returns.rolling(window, min_periods=min_periods).cov(benchmark_returns)
+    var = benchmark_returns.rolling(window, min_periods=min_periods).var()
+    return cov.div(var, axis=0)
+
+def rolling_volatility(returns, window=60):
+    """
+    Rolling annualized volatility of every column.
+    """
+    return returns.rolling(window, min_periods=window // 2).std() * np.sqrt(TRADING_DAYS)
+
+def beta_vol_summary(close, benchmark=BENCHMARK, window=60):
+    """
+    Latest rolling beta (vs. `benchmark`, which must be a column of `close`)
+    and annualized volatility per ticker.
+    """
+    returns = daily_returns(close)
+    bench = returns[benchmark]
+    stocks = returns.drop(columns=benchmark)
+    beta = rolling_beta(stocks, bench, window)
+    vol = rolling_volatility(stocks, window)
+    return pd.DataFrame({
+        'Beta': beta.ffill().iloc[-1],
+        'Volatility': vol.ffill().iloc[-1],
+        'Correlation': stocks.iloc[-window:].corrwith(bench.iloc[-window:]),
+    }).sort_values('Beta', ascending=False)
+
+
+#%% Technicals
+def technical_snapshot(frames):
+    """
+    Latest technicals per ticker, computed for all tickers in one batch of
+    wide (date x ticker) rolling calls: RSI14, distance from MA50/MA200 and
+    ATR14 as a share of the close.
+    """
+    from utils.indicators import compute_indicators_batch
+
+    if not frames:
+        return pd.DataFrame(columns=['RSI14', 'vs MA50', 'vs MA200', 'ATR %'])
+    wide = compute_indicators_batch(frames, names=['MA50', 'MA200', 'RSI14', 'ATR14'])
+    close = close_matrix(frames)
+    last = lambda frame: frame.ffill().iloc[-1]
+    latest_close = last(close)
+    return pd.DataFrame({
+        'RSI14': last(wide['RSI14']),
+        'vs MA50': latest_close / last(wide['MA50']) - 1,
+        'vs MA200': latest_close / last(wide['MA200']) - 1,
+        'ATR %': last(wide['ATR14']) / latest_close,
+    })
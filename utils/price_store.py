@@ -0,0 +1,181 @@
+#%%
+"""
+Columnar on-disk store for OHLCV bars at any resolution.
+
+Layout: data/prices/<resolution>/<SYMBOL>/<YYYY-MM>.arrow, one Arrow file per
+symbol and month with a compact schema (int64 epoch seconds, float32 prices,
+int64 volumes). Appends only rewrite the months they touch, and reads only
+open the months inside the requested range.
+
+Coarser bars are derived from finer ones locally with vectorized bucket
+reductions, so weekly/monthly bars come from daily bars and 5-60 minute bars
+come from 1-minute bars without another request to SSI.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.utils import get_data_path, get_temp_path
+
+# Endpoint resolutions and their bar length in seconds (None = calendar based)
+RESOLUTIONS = {"1": 60, "5": 300, "15": 900, "30": 1800, "60": 3600, "1D": None, "1W": None, "1M": None}
+INTRADAY = ["1", "5", "15", "30", "60"]
+# Resolutions built locally from a finer stored resolution instead of fetched
+DERIVED_FROM = {"5": "1", "15": "1", "30": "1", "60": "1", "1W": "1D", "1M": "1D"}
+
+VN_UTC_OFFSET = 7 * 3600  # trading sessions are bucketed by Vietnam local time
+COLUMNS = ["t", "o", "h", "l", "c", "v"]
+_DTYPES = {"t": "int64", "o": "float32", "h": "float32", "l": "float32", "c": "float32", "v": "int64"}
+
+
+def get_store_dir(symbol, resolution):
+    return get_data_path("prices") / resolution / symbol
+
+
+#%% Conversions
+def to_compact(df):
+    """
+    Convert an OHLCV frame (date, open, high, low, close, volume) to the
+    compact store layout.
+    """
+    bars = pd.DataFrame({
+        "t": df["date"].to_numpy("datetime64[s]").astype("int64"),
+        "o": df["open"], "h": df["high"], "l": df["low"], "c": df["close"],
+        "v": df["volume"],
+    })
+    return bars.astype(_DTYPES)
+
+def to_ohlcv(bars):
+    """
+    Convert compact bars back to the OHLCV frame used by the charts.
+    """
+    return pd.DataFrame({
+        "date": pd.to_datetime(bars["t"].to_numpy(), unit="s"),
+        "open": bars["o"].to_numpy("float64"),
+        "high": bars["h"].to_numpy("float64"),
+        "low": bars["l"].to_numpy("float64"),
+        "close": bars["c"].to_numpy("float64"),
+        "volume": bars["v"].to_numpy(),
+    })
+
+def _month_keys(t, resolution):
+    # Intraday bars belong to the local trading day's month; daily and coarser
+    # bars are already stamped at midnight UTC of their date
+    offset = VN_UTC_OFFSET if resolution in INTRADAY else 0
+    return (t + offset).astype("datetime64[s]").astype("datetime64[M]")
+
+
+#%% Read / write
+def write_bars(symbol, resolution, bars):
+    """
+    Merge bars into the store. Rows with an existing timestamp replace the
+    stored copy (the last bar of a session may have been partial).
+    Only the month partitions touched by `bars` are rewritten.
+    """
+    if bars.empty:
+        return
+    bars = bars[COLUMNS].astype(_DTYPES)
+    store_dir = get_store_dir(symbol, resolution)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    months = _month_keys(bars["t"].to_numpy(), resolution)
+    for month, part in bars.groupby(months, sort=False):
+        path = store_dir / f"{pd.Timestamp(month):%Y-%m}.arrow"
+        if path.exists():
+            part = pd.concat([pd.read_feather(path), part])
+        _write_partition(path, part.drop_duplicates("t", keep="last").sort_values("t").reset_index(drop=True))
+
+def _write_partition(path, part):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = get_temp_path(path)
+    try:
+        part.to_feather(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+def replace_bars(symbol, resolution, bars):
+    """
+    Replace the stored bars with `bars` (a full reload, e.g. after a price
+    adjustment): every month is rewritten and months not in `bars` are removed.
+    """
+    store_dir = get_store_dir(symbol, resolution)
+    old = {p.name for p in store_dir.glob("*.arrow")} if store_dir.exists() else set()
+    months = _month_keys(bars["t"].to_numpy(), resolution)
+    keep = {f"{pd.Timestamp(m):%Y-%m}.arrow" for m in np.unique(months)}
+    for month, part in bars[COLUMNS].astype(_DTYPES).groupby(months, sort=False):
+        _write_partition(store_dir / f"{pd.Timestamp(month):%Y-%m}.arrow",
+                         part.drop_duplicates("t", keep="last").sort_values("t").reset_index(drop=True))
+    for name in old - keep:
+        (store_dir / name).unlink(missing_ok=True)
+
+def read_bars(symbol, resolution, start=None, end=None):
+    """
+    Read stored bars for [start, end] (dates or None for open ends), opening
+    only the month partitions that overlap the range.
+    """
+    store_dir = get_store_dir(symbol, resolution)
+    if not store_dir.exists():
+        return pd.DataFrame({c: pd.Series(dtype=d) for c, d in _DTYPES.items()})
+    first = f"{pd.Timestamp(start):%Y-%m}" if start is not None else ""
+    last = f"{pd.Timestamp(end):%Y-%m}" if end is not None else "9999-99"
+    paths = sorted(p for p in store_dir.glob("*.arrow") if first <= p.stem <= last)
+    if not paths:
+        return pd.DataFrame({c: pd.Series(dtype=d) for c, d in _DTYPES.items()})
+    bars = pd.concat([pd.read_feather(p) for p in paths], ignore_index=True)
+    t = bars["t"].to_numpy()
+    mask = np.ones(len(bars), dtype=bool)
+    if start is not None:
+        mask &= t >= pd.Timestamp(start).value // 10**9
+    if end is not None:
+        mask &= t < (pd.Timestamp(end) + pd.Timedelta(days=1)).value // 10**9
+    return bars[mask].reset_index(drop=True)
+
+def store_version(symbol, resolution):
+    """
+    Cheap change token for a symbol's stored bars: (partition count, newest mtime).
+    """
+    store_dir = get_store_dir(symbol, resolution)
+    if not store_dir.exists():
+        return None
+    mtimes = [entry.stat().st_mtime_ns for entry in os.scandir(store_dir) if entry.name.endswith(".arrow")]
+    return (len(mtimes), max(mtimes)) if mtimes else None
+
+
+#%% Aggregation
+def _bucket_keys(t, resolution):
+    """
+    Bucket label (epoch seconds of the bucket start) for each timestamp.
+    """
+    seconds = RESOLUTIONS[resolution]
+    if seconds is not None:
+        return t - t % seconds
+    # Local trading day; daily bars are stamped at midnight UTC of their date,
+    # which the offset leaves on the same day
+    day = (t + VN_UTC_OFFSET) // 86400
+    if resolution == "1D":
+        return day * 86400
+    if resolution == "1W":
+        # 1970-01-01 was a Thursday; shift so weeks start on Monday
+        return ((day + 3) // 7 * 7 - 3) * 86400
+    months = day.astype("datetime64[D]").astype("datetime64[M]")
+    return months.astype("datetime64[s]").astype("int64")
+
+def aggregate_bars(bars, resolution):
+    """
+    Aggregate time-sorted bars into coarser `resolution` bars with segment
+    reductions over the sorted timestamps (no per-bucket Python loop).
+    """
+    if bars.empty:
+        return bars
+    keys = _bucket_keys(bars["t"].to_numpy(), resolution)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+    return pd.DataFrame({
+        "t": keys[starts],
+        "o": bars["o"].to_numpy()[starts],
+        "h": np.maximum.reduceat(bars["h"].to_numpy(), starts),
+        "l": np.minimum.reduceat(bars["l"].to_numpy(), starts),
+        "c": bars["c"].to_numpy()[ends],
+        "v": np.add.reduceat(bars["v"].to_numpy(), starts),
+    }).astype(_DTYPES)
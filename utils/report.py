@@ -0,0 +1,188 @@
+#%%
+"""
+Batch export of the Company and Bank dashboard sections to static reports.
+
+    python -m utils.report [--tickers T ...] [--sector L2] [--group G] [--start-year 2020]
+                           [--formats html xlsx] [--out DIR] [--workers N]
+
+For each ticker a pool worker renders the Company page figures and tables
+(utils.company) and, for banks, the Bank page single-bank tables and charts
+(utils.bank), and writes <out>/<TICKER>.html itself. The tables are sent back
+to the parent, which streams them into one write-only openpyxl workbook
+(<out>/report.xlsx, a sheet per ticker). At most 2 x workers tickers are in
+flight, so memory is bounded by that window and not by the size of the pack.
+
+Workers load the datasets once, in the pool initializer. With
+DASHBOARD_DATA_MODE=shared these are memory-mapped Arrow files, so all
+workers read the same physical pages.
+"""
+import argparse
+import html
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import pandas as pd
+import plotly.graph_objects as go
+
+from utils import bank, company
+from utils.cache import derive
+from utils.datasets import read_dataset
+from utils.utils import get_data_path, get_project_root
+
+_data = {}  # per-worker datasets, set by _init_worker
+
+
+#%% Worker
+def _read_optional(filename):
+    return read_dataset(filename) if get_data_path(filename).exists() else None
+
+def _init_worker(start_year):
+    fa = _read_optional("FA_processed.csv")
+    supp = _read_optional("BankSupp_processed.csv")
+    statements = bank.load_statements('quarterly')
+    _data.update(
+        start_year=start_year,
+        fa=derive(fa[fa['YEAR'] >= start_year], fa, 'YEAR>=', start_year) if fa is not None else None,
+        val=_read_optional("Val_processed.csv"),
+        supp=derive(supp[supp['YEARREPORT'] >= start_year], supp, 'YEARREPORT>=', start_year) if supp is not None else None,
+        statements=statements,
+        banks=set(statements['TICKER'].astype(str)),
+    )
+
+def _has(frame, ticker):
+    return frame is not None and (frame['TICKER'] == ticker).any()
+
+def _figure_html(fig, include_plotlyjs):
+    fig = fig if isinstance(fig, go.Figure) else go.Figure(fig)
+    return fig.to_html(full_html=False, include_plotlyjs='cdn' if include_plotlyjs else False)
+
+def render_ticker(ticker, out_dir, formats):
+    """
+    Render one ticker's report. Returns (ticker, [(title, table)], error).
+    """
+    try:
+        tables, figures = [], []
+        fa, val, supp = _data['fa'], _data['val'], _data['supp']
+        if _has(fa, ticker):
+            tables += [
+                ("Financial Summary (IS, Growth, Margin)", company.create_fs_table_main(fa, ticker)),
+                ("Balance Sheet", company.create_bs_table(fa, ticker)),
+                ("Cash Flow", company.create_cf_table(fa, ticker)),
+            ]
+            figures += [company.create_FA_plots(fa, ticker), company.create_gr_plots(fa, ticker),
+                        company.create_margin_plots(fa, ticker)]
+        if _has(supp, ticker):
+            figures.append(company.create_bank_plots(supp, ticker))
+        if _has(val, ticker):
+            figures.append(company.create_pe_pb_plot(val, ticker))
+        if ticker in _data['banks']:
+            single = bank.single_ticker(_data['statements'], ticker)
+            for title, builder in [("Bank Income Statement", bank.single_income_statement),
+                                   ("Bank Sizes", bank.single_size),
+                                   ("Bank Earnings Quality", bank.single_earnings_quality),
+                                   ("Bank Asset Quality", bank.single_asset_quality)]:
+                table = builder(single, startperiod=_data['start_year'])
+                tables.append((title, table))
+                figures.append(bank.plot(table))
+        if not tables and not figures:
+            return ticker, [], "no data"
+
+        if 'html' in formats:
+            parts = [f"<h1>{html.escape(ticker)}</h1>"]
+            for title, table in tables:
+                parts += [f"<h2>{html.escape(title)}</h2>", table.to_html(na_rep='', border=0)]
+            for i, fig in enumerate(figures):
+                parts.append(_figure_html(fig, include_plotlyjs=(i == 0)))
+            page = (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{html.escape(ticker)}</title></head>"
+                    f"<body>{''.join(parts)}</body></html>")
+            with open(os.path.join(out_dir, f"{ticker}.html"), "w", encoding="utf-8") as f:
+                f.write(page)
+        return ticker, (tables if 'xlsx' in formats else []), None
+    except Exception as e:
+        return ticker, [], f"{type(e).__name__}: {e}"
+
+
+#%% Export
+def _cell(value):
+    return None if pd.isna(value) else value
+
+def _append_tables(workbook, ticker, tables):
+    sheet = workbook.create_sheet(title=ticker[:31])
+    for title, table in tables:
+        sheet.append([title])
+        sheet.append([table.index.name or ''] + [str(c) for c in table.columns])
+        for index, row in zip(table.index, table.itertuples(index=False)):
+            sheet.append([str(index)] + [_cell(v) for v in row])
+        sheet.append([])
+
+def select_tickers(tickers=None, sector=None, group=None):
+    """
+    Explicit tickers, an L2 sector, a bank Classification group ('all' for
+    every bank), or by default every ticker with FA data plus every bank.
+    """
+    if tickers:
+        return list(dict.fromkeys(tickers))
+    if sector:
+        from utils.price_analytics import get_universe
+        return get_universe(sector)
+    classification = bank.load_classification()
+    if group:
+        if group != 'all':
+            classification = classification[classification['GROUP'] == group]
+        return classification['TICKER'].astype(str).tolist()
+    fa = _read_optional("FA_processed.csv")
+    universe = fa['TICKER'].dropna().astype(str).unique().tolist() if fa is not None else []
+    return list(dict.fromkeys(universe + classification['TICKER'].astype(str).tolist()))
+
+def export_reports(tickers, out_dir, formats=('html', 'xlsx'), start_year=2020, workers=None):
+    """
+    Render `tickers` on a process pool. Returns {ticker: error} for the
+    tickers that could not be rendered.
+    """
+    from openpyxl import Workbook
+
+    os.makedirs(out_dir, exist_ok=True)
+    workbook = Workbook(write_only=True) if 'xlsx' in formats else None
+    errors = {}
+    workers = workers or os.cpu_count() or 1
+    # Keep at most two renders per worker queued, so finished tables do not pile up
+    window = 2 * workers
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(start_year,)) as pool:
+        pending = deque()
+
+        def collect():
+            ticker, tables, error = pending.popleft().result()
+            if error:
+                errors[ticker] = error
+            elif workbook is not None and tables:
+                _append_tables(workbook, ticker, tables)
+
+        for ticker in tickers:
+            pending.append(pool.submit(render_ticker, ticker, out_dir, tuple(formats)))
+            if len(pending) >= window:
+                collect()
+        while pending:
+            collect()
+    if workbook is not None:
+        workbook.save(os.path.join(out_dir, "report.xlsx"))
+    return errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export Company/Bank dashboard reports.")
+    parser.add_argument("--tickers", nargs="+", help="tickers to export")
+    parser.add_argument("--sector", help="L2 sector from STOCK LIST.xlsx")
+    parser.add_argument("--group", help="bank group from Classification.xlsx (1, 2, 3, SOCB or all)")
+    parser.add_argument("--start-year", type=int, default=2020)
+    parser.add_argument("--formats", nargs="+", choices=["html", "xlsx"], default=["html", "xlsx"])
+    parser.add_argument("--out", default=str(get_project_root() / "reports" / date.today().isoformat()))
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    args = parser.parse_args()
+
+    tickers = select_tickers(args.tickers, args.sector, args.group)
+    errors = export_reports(tickers, args.out, args.formats, args.start_year, args.workers)
+    print(f"exported {len(tickers) - len(errors)}/{len(tickers)} tickers to {args.out}")
+    for ticker, error in errors.items():
+        print(f"  {ticker}: {error}")
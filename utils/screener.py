@@ -0,0 +1,78 @@
+#%%
+"""
+Stock screener over a latest-snapshot table of fundamentals and valuation.
+
+The snapshot has one row per ticker and one column per metric, so every
+screening condition is a single vectorized comparison over a column and a
+query is the AND of those masks.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.keycodes import IS, MARGIN, BS, CF
+from utils.snapshot import VALUATION, build_latest_snapshot
+from utils.utils import get_data_path
+
+OPERATORS = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    '=': np.equal,
+}
+
+
+#%% Snapshot table
+def latest_fundamentals(fa):
+    """
+    Latest reported period per ticker, one column per keycode.
+    Money items are in bn VND; margins and YoY growth are in %.
+    """
+    latest_date = fa.groupby('TICKER')['DATE'].transform('max')
+    latest = fa[(fa['DATE'] == latest_date) & fa['KEYCODE'].isin(IS + MARGIN + BS + CF)]
+    values = latest.pivot_table(index='TICKER', columns='KEYCODE', values='VALUE', aggfunc='last')
+    values = values.reindex(columns=[k for k in IS + MARGIN + BS + CF if k in values.columns])
+    money = [k for k in values.columns if k not in MARGIN]
+    values[money] = values[money] / 1e9
+    values[[k for k in MARGIN if k in values.columns]] *= 100
+
+    growth = latest[latest['KEYCODE'].isin(IS)].pivot_table(index='TICKER', columns='KEYCODE', values='YoY', aggfunc='last') * 100
+    growth = growth.rename(columns=lambda k: f"{k}_YoY")
+
+    period = latest.groupby('TICKER')['DATE'].first().rename('PERIOD')
+    return pd.concat([period, values, growth], axis=1)
+
+def build_screener_table(fa, val, mcap, snapshot=None):
+    """
+    One row per ticker with its L2 sector, latest fundamentals, YoY growth,
+    valuation multiples and market cap. Pass a prebuilt headline `snapshot`
+    (utils.snapshot) to reuse it.
+    """
+    if snapshot is None:
+        snapshot = build_latest_snapshot(val, mcap)
+    sectors = pd.read_excel(get_data_path("STOCK LIST.xlsx")).drop_duplicates('Ticker').set_index('Ticker')['L2']
+    table = latest_fundamentals(fa).join(snapshot[VALUATION + ['M_CAP']], how='outer')
+    table.insert(0, 'L2', sectors.reindex(table.index))
+    table.index.name = 'TICKER'
+    return table
+
+
+#%% Screening
+def screen(table, conditions, sectors=None):
+    """
+    Filter the snapshot table.
+    conditions: iterable of (column, operator, value) with operator in OPERATORS.
+    Rows with a missing value in a screened column never match.
+    """
+    mask = np.ones(len(table), dtype=bool)
+    if sectors:
+        mask &= table['L2'].isin(sectors).to_numpy()
+    for column, op, value in conditions:
+        values = pd.to_numeric(table[column], errors='coerce').to_numpy(dtype='float64')
+        with np.errstate(invalid='ignore'):
+            mask &= OPERATORS[op](values, float(value))
+    return table[mask]
+
+def rank(table, column, ascending=False, top=None):
+    ranked = table.sort_values(column, ascending=ascending, na_position='last')
+    return ranked.head(top) if top else ranked
@@ -0,0 +1,52 @@
+#%%
+"""
+Latest-value snapshot of the headline metrics, one row per ticker.
+
+Built once per data load with a single groupby-last over each dataset, so
+pages look up a ticker's latest P/E, P/B, EV/EBITDA, market cap and report
+period by index instead of sorting the ticker's full history on every rerun.
+"""
+import pandas as pd
+
+VALUATION = ['P/E', 'P/B', 'P/S', 'EV/EBITDA']
+
+
+def build_latest_snapshot(val, mcap, fa=None):
+    """
+    Columns:
+    - P/E, P/B, P/S, EV/EBITDA: latest non-null value, with <metric>_DATE
+    - TRADE_DATE: latest valuation date of the ticker
+    - M_CAP, M_CAP_DATE: latest non-null market cap
+    - LAST_PERIOD: latest FA report period (when `fa` is given)
+    """
+    val = val.sort_values('TRADE_DATE')
+    latest = pd.DataFrame({'TICKER': val['TICKER'].to_numpy(), 'TRADE_DATE': val['TRADE_DATE'].to_numpy()})
+    for col in VALUATION:
+        values = pd.to_numeric(val[col], errors='coerce').to_numpy(dtype='float64')
+        latest[col] = values
+        # The date only survives where the value is present, so groupby-last
+        # returns the date of the latest non-null value
+        latest[f"{col}_DATE"] = val['TRADE_DATE'].where(~pd.isna(values)).to_numpy()
+    snapshot = latest.groupby('TICKER').last()
+
+    mcap = mcap.sort_values('TRADE_DATE')
+    mcap_latest = pd.DataFrame({
+        'TICKER': mcap['TICKER'].to_numpy(),
+        'M_CAP': pd.to_numeric(mcap['CUR_MKT_CAP'], errors='coerce').to_numpy(dtype='float64'),
+    })
+    mcap_latest['M_CAP_DATE'] = mcap['TRADE_DATE'].where(mcap_latest['M_CAP'].notna().to_numpy()).to_numpy()
+    snapshot = snapshot.join(mcap_latest.groupby('TICKER').last(), how='outer')
+
+    if fa is not None:
+        snapshot = snapshot.join(fa.groupby('TICKER')['DATE'].max().rename('LAST_PERIOD'), how='outer')
+    snapshot.index.name = 'TICKER'
+    return snapshot
+
+def lookup(snapshot, ticker):
+    """
+    Headline metrics for one ticker as a dict (None where unavailable).
+    """
+    if ticker not in snapshot.index:
+        return dict.fromkeys(snapshot.columns)
+    row = snapshot.loc[ticker]
+    return {k: (None if pd.isna(v) else v) for k, v in row.items()}
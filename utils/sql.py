@@ -0,0 +1,133 @@
+#%%
+"""
+Embedded DuckDB engine over the dashboard datasets.
+
+Each dataset is loaded into an in-process DuckDB table the first time a query
+references it and reloaded when its dataset version changes:
+
+    bank_quarterly    df_q_full, numeric (items in bn VND, CA ratios as fractions)
+    bank_annual       df_a_full_formatted, numeric in the same units
+    fa_long           FA_processed (TICKER, KEYCODE, DATE, VALUE, YoY, YEAR)
+    valuation_daily   Val_processed (TICKER, TRADE_DATE, P/E, P/B, P/S, EV/EBITDA)
+    market_cap_daily  MktCap_processed (TICKER, TRADE_DATE, CUR_MKT_CAP)
+
+Keycode columns keep their names, so they are quoted in SQL: "BS.1", "CA.27".
+Every query runs on its own cursor, so concurrent sessions do not share
+statement state. File system access is disabled on the connection, and
+`run_user_query` only accepts SELECT statements.
+"""
+import re
+import threading
+
+import duckdb
+
+from utils import bank
+from utils.cache import set_version
+from utils.datasets import dataset_version, read_dataset
+
+_con = None
+_versions = {}  # table -> dataset version loaded
+_lock = threading.Lock()
+_con_lock = threading.Lock()
+
+
+#%% Tables
+def _bank_table(formatted):
+    def prepare(frame):
+        numeric = bank.to_numeric(frame, bank.ca_formats(bank.load_keycode_mapping()), formatted=formatted)
+        numeric['DATE'] = bank.period_label(numeric)
+        return numeric
+    return prepare
+
+TABLES = {
+    'bank_quarterly': ("df_q_full.csv", _bank_table(formatted=False)),
+    'bank_annual': ("df_a_full_formatted.csv", _bank_table(formatted=True)),
+    'fa_long': ("FA_processed.csv", None),
+    'valuation_daily': ("Val_processed.csv", None),
+    'market_cap_daily': ("MktCap_processed.csv", None),
+}
+
+def _connection():
+    global _con
+    with _con_lock:
+        if _con is None:
+            con = duckdb.connect(":memory:")
+            con.execute("SET enable_external_access = false")
+            _con = con
+    return _con
+
+def ensure_table(name):
+    """
+    Load or refresh a table from its dataset. Returns the dataset version.
+    """
+    filename, prepare = TABLES[name]
+    version = dataset_version(filename)
+    with _lock:
+        if _versions.get(name) != version:
+            frame = read_dataset(filename)
+            if prepare is not None:
+                frame = prepare(frame)
+            con = _connection()
+            con.register("_incoming", frame)
+            try:
+                con.execute(f'CREATE OR REPLACE TABLE "{name}" AS SELECT * FROM _incoming')
+            finally:
+                con.unregister("_incoming")
+            _versions[name] = version
+    return version
+
+def columns(name):
+    ensure_table(name)
+    cursor = _connection().cursor()
+    try:
+        return [row[0] for row in cursor.execute(f'DESCRIBE "{name}"').fetchall()]
+    finally:
+        cursor.close()
+
+
+#%% Queries
+def _referenced_tables(sql):
+    return [name for name in TABLES if re.search(rf'\b{name}\b', sql, flags=re.IGNORECASE)]
+
+def query(sql, params=None):
+    """
+    Run SQL and return a DataFrame. The tables it references are loaded (or
+    refreshed) first; the result is tagged with the query and their versions
+    for utils.cache.
+    """
+    versions = tuple(ensure_table(name) for name in _referenced_tables(sql))
+    cursor = _connection().cursor()
+    try:
+        result = cursor.execute(sql, params).df()
+    finally:
+        cursor.close()
+    return set_version(result, ('sql', sql, repr(params), versions))
+
+def run_user_query(sql, limit=10000):
+    """
+    Ad-hoc query from the SQL tab: a single SELECT, capped at `limit` rows.
+    """
+    sql = sql.strip().rstrip(';')
+    cursor = _connection().cursor()
+    try:
+        statements = cursor.extract_statements(sql)
+    finally:
+        cursor.close()
+    if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+        raise ValueError("Only a single SELECT statement is allowed.")
+    return query(f"SELECT * FROM ({sql}) LIMIT {int(limit)}")
+
+def bank_series(tickers, keycodes, start_year, frequency='quarterly'):
+    """
+    Rows of `tickers` from `start_year` on with the key columns and `keycodes`,
+    ordered by ticker and period.
+    """
+    table = 'bank_quarterly' if frequency == 'quarterly' else 'bank_annual'
+    available = set(columns(table))
+    selected = ''.join(f', "{k}"' for k in keycodes if k in available)
+    return query(
+        f'SELECT TICKER, YEARREPORT, LENGTHREPORT, DATE{selected} FROM {table} '
+        'WHERE TICKER IN (SELECT unnest(?::VARCHAR[])) AND YEARREPORT >= ? '
+        'ORDER BY TICKER, YEARREPORT, LENGTHREPORT',
+        [[str(t) for t in tickers], int(start_year)],
+    )
@@ -1,3 +1,5 @@
+import os
+import uuid
 from pathlib import Path
 
 def get_project_root() -> Path:
@@ -6,4 +8,12 @@ def get_project_root() -> Path:
 
 def get_data_path(filename: str) -> Path:
     """Returns the full path to a file in the /data directory."""
-    return get_project_root() / "data" / filename
\ No newline at end of file
+    return get_project_root() / "data" / filename
+
+def get_shared_data_path(filename: str) -> Path:
+    """Returns the path of the memory-mappable Arrow copy of a /data file."""
+    return get_project_root() / "data" / "shared" / f"{Path(filename).stem}.arrow"
+
+def get_temp_path(path: Path) -> Path:
+    """Returns a unique temporary path next to `path`, to write and then os.replace into place."""
+    return path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
\ No newline at end of file